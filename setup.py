@@ -4,6 +4,7 @@ setup(
     name="finreal-ingestor",
     version="0.1",
     packages=find_packages(),
+    python_requires=">=3.10",
     install_requires=[
         "pandas",
         "supabase",
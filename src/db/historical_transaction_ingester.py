@@ -11,6 +11,49 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Banks recognised in historical file names, checked in order
+HISTORICAL_BANKS = ('bbva', 'ruralvia', 'santander')
+
+# Column mappings for historical exports keyed by (bank, is_virtual)
+HISTORICAL_COLUMN_MAPPINGS = {
+    ('bbva', True): {
+        'Fecha': 'date',
+        'Concepto': 'description',
+        'Importe': 'amount',
+        'Tarjeta': 'card_number'
+    },
+    ('bbva', False): {
+        'Fecha': 'date',
+        'Concepto': 'description',
+        'Movimiento': 'movement',
+        'Importe': 'amount',
+        'Disponible': 'balance'
+    },
+    ('ruralvia', True): {
+        'Fecha del movimiento': 'date',
+        'Importe': 'amount',
+        'Concepto': 'description',
+        'Comercio': 'merchant'
+    },
+    ('ruralvia', False): {
+        'Fecha Ejecución': 'date',
+        'Descripcion': 'description',
+        'Importe': 'amount',
+        'Saldo': 'balance'
+    },
+    ('santander', True): {
+        'FECHA OPERACIÓN': 'date',
+        'CONCEPTO': 'description',
+        'IMPORTE EUR': 'amount'
+    },
+    ('santander', False): {
+        'FECHA OPERACIÓN': 'date',
+        'CONCEPTO': 'description',
+        'IMPORTE EUR': 'amount',
+        'SALDO': 'balance'
+    },
+}
+
 class HistoricalTransactionIngester:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -106,59 +149,20 @@ class HistoricalTransactionIngester:
             # Read CSV file
             df = pd.read_csv(csv_path, sep=';')
             
-            # Map column names based on bank
-            if 'bbva' in csv_path.lower():
-                if 'virtual' in csv_path.lower():
-                    column_mapping = {
-                        'Fecha': 'date',
-                        'Concepto': 'description',
-                        'Importe': 'amount',
-                        'Tarjeta': 'card_number'
-                    }
-                else:
-                    column_mapping = {
-                        'Fecha': 'date',
-                        'Concepto': 'description',
-                        'Movimiento': 'movement',
-                        'Importe': 'amount',
-                        'Disponible': 'balance'
-                    }
-            elif 'ruralvia' in csv_path.lower():
-                if 'virtual' in csv_path.lower():
-                    column_mapping = {
-                        'Fecha del movimiento': 'date',
-                        'Importe': 'amount',
-                        'Concepto': 'description',
-                        'Comercio': 'merchant'
-                    }
-                else:
-                    column_mapping = {
-                        'Fecha Ejecución': 'date',
-                        'Descripcion': 'description',
-                        'Importe': 'amount',
-                        'Saldo': 'balance'
-                    }
-            elif 'santander' in csv_path.lower():
-                if 'virtual' in csv_path.lower():
-                    column_mapping = {
-                        'FECHA OPERACIÓN': 'date',
-                        'CONCEPTO': 'description',
-                        'IMPORTE EUR': 'amount'
-                    }
-                else:
-                    column_mapping = {
-                        'FECHA OPERACIÓN': 'date',
-                        'CONCEPTO': 'description',
-                        'IMPORTE EUR': 'amount',
-                        'SALDO': 'balance'
-                    }
-            else:
+            # Detect bank and account type from the file name in a single lowercased pass
+            csv_path_lower = csv_path.lower()
+            bank = next((bank for bank in HISTORICAL_BANKS if bank in csv_path_lower), None)
+            is_virtual = 'virtual' in csv_path_lower
+            if bank is None:
                 raise ValueError(f"Unknown bank format in file: {csv_path}")
             
+            # Map column names based on bank
+            column_mapping = HISTORICAL_COLUMN_MAPPINGS[(bank, is_virtual)]
+            
             df = df.rename(columns=column_mapping)
             
             # Convert date format to datetime - handle different date formats
-            if 'bbva' in csv_path.lower() and 'virtual' in csv_path.lower():
+            if bank == 'bbva' and is_virtual:
                 # Handle ISO8601 format for BBVA virtual accounts (2024-10-24T15:58:59.000+0200)
                 df['date'] = pd.to_datetime(df['date'], format='ISO8601')
             else:
@@ -169,7 +173,7 @@ class HistoricalTransactionIngester:
             df['description'] = df['description'].fillna("No description")
             
             # For BBVA files, merge Concepto and Movimiento for better description
-            if 'bbva' in csv_path.lower() and 'movement' in df.columns:
+            if bank == 'bbva' and 'movement' in df.columns:
                 # Only add Movimiento if it's not 'Otros', 'Pago con tarjeta', or empty
                 def merge_description(row):
                     if pd.isna(row['movement']) or row['movement'] == '' or 'Otros' in row['movement'] or 'Pago con tarjeta' in row['movement']:
@@ -180,7 +184,7 @@ class HistoricalTransactionIngester:
                 df = df.drop('movement', axis=1)
             
             # For virtual accounts, combine Concepto and Comercio for better description
-            if 'virtual' in csv_path.lower() and 'merchant' in df.columns:
+            if is_virtual and 'merchant' in df.columns:
                 df['description'] = df['description'] + ' - ' + df['merchant'].fillna('')
                 df = df.drop('merchant', axis=1)
             
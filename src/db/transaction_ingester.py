@@ -3,6 +3,7 @@ from datetime import datetime
 import pandas as pd
 from uuid import UUID
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 import logging
 from .supabase import SupabaseClient
@@ -11,6 +12,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Columns written by CaixaScraper.export_transactions_to_csv
+CAIXA_COLUMNS = ['date', 'description', 'category', 'amount', 'account']
+CAIXA_DTYPES = {'date': str, 'description': str, 'category': str, 'amount': 'float64', 'account': str}
+
+# Rows read at a time from the Caixa export
+CAIXA_READ_CHUNK_SIZE = 10000
+
 class TransactionIngester:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -105,129 +113,173 @@ class TransactionIngester:
             "amount": amount
         }
 
-    def ingest_transactions(self, csv_path: str, account_number: str, bank_id: int, account_id: int):
-        """Ingest transactions from CSV file using batch processing"""
-        try:
-            # Get or verify account ID
-            account_id = self.get_account(account_number, bank_id, account_id)
-            
-            # Read CSV file
-            df = pd.read_csv(csv_path, sep=',')
-            
-            # Map Spanish column names to English based on bank
-            if 'Fecha del movimiento' in df.columns:  # Ruralvia virtual card format
-                column_mapping = {
-                    'Fecha del movimiento': 'date',
-                    'Concepto': 'description',
-                    'Importe': 'amount',
-                    'Comercio': 'merchant'
-                }
-            elif 'Fecha Ejecución' in df.columns:  # Ruralvia format
-                column_mapping = {
-                    'Fecha Ejecución': 'date',
-                    'Descripcion': 'description',
-                    'Importe': 'amount',
-                    'Saldo': 'balance'
-                }
-            elif 'FECHA OPERACIÓN' in df.columns:  # Santander format
-                column_mapping = {
-                    'FECHA OPERACIÓN': 'date',
-                    'CONCEPTO': 'description',
-                    'IMPORTE EUR': 'amount',
-                    'SALDO': 'balance'
-                }
-            elif 'more_info' in df.columns:  # BBVA format with more_info column
-                # BBVA columns are already in English, no need to rename
-                column_mapping = {}
-            else:  # Default BBVA format or other formats
-                column_mapping = {
-                    'Fecha': 'date',
-                    'Concepto': 'description',
-                    'Importe': 'amount',
-                    'Disponible': 'balance'
-                }
-            
-            # Only rename columns if there's a mapping
-            if column_mapping:
-                df = df.rename(columns=column_mapping)
-            
-            # Convert date format to datetime - handle ISO format dates
-            df['date'] = pd.to_datetime(df['date'])
-            
-            # For virtual cards, combine Concepto and Comercio for better description
-            if 'merchant' in df.columns:
-                df['description'] = df.apply(
-                    lambda row: f"{row['description']} - {row['merchant']}" 
-                    if not pd.isna(row['merchant']) else row['description'],
-                    axis=1
-                )
-                df = df.drop('merchant', axis=1)
+    def load_transactions(self, csv_path: str) -> pd.DataFrame:
+        """Read a CSV export and normalize it into date/description/amount/balance columns with hashes"""
+        return self.normalize_transactions(pd.read_csv(csv_path, sep=','))
+
+    def normalize_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Normalize an export dataframe into date/description/amount/balance columns with hashes"""
+        # Map Spanish column names to English based on bank
+        if 'Fecha del movimiento' in df.columns:  # Ruralvia virtual card format
+            column_mapping = {
+                'Fecha del movimiento': 'date',
+                'Concepto': 'description',
+                'Importe': 'amount',
+                'Comercio': 'merchant'
+            }
+        elif 'Fecha Ejecución' in df.columns:  # Ruralvia format
+            column_mapping = {
+                'Fecha Ejecución': 'date',
+                'Descripcion': 'description',
+                'Importe': 'amount',
+                'Saldo': 'balance'
+            }
+        elif 'FECHA OPERACIÓN' in df.columns:  # Santander format
+            column_mapping = {
+                'FECHA OPERACIÓN': 'date',
+                'CONCEPTO': 'description',
+                'IMPORTE EUR': 'amount',
+                'SALDO': 'balance'
+            }
+        elif 'more_info' in df.columns:  # BBVA format with more_info column
+            # BBVA columns are already in English, no need to rename
+            column_mapping = {}
+        else:  # Default BBVA format or other formats
+            column_mapping = {
+                'Fecha': 'date',
+                'Concepto': 'description',
+                'Importe': 'amount',
+                'Disponible': 'balance'
+            }
+        
+        # Only rename columns if there's a mapping
+        if column_mapping:
+            df = df.rename(columns=column_mapping)
+        
+        # Convert date format to datetime - handle ISO format dates
+        df['date'] = pd.to_datetime(df['date'])
+        
+        # For virtual cards, combine Concepto and Comercio for better description
+        if 'merchant' in df.columns:
+            df['description'] = df.apply(
+                lambda row: f"{row['description']} - {row['merchant']}" 
+                if not pd.isna(row['merchant']) else row['description'],
+                axis=1
+            )
+            df = df.drop('merchant', axis=1)
+        
+        # For BBVA transactions, handle special description concatenation
+        if 'more_info' in df.columns:
+            # List of values to exclude from more_info
+            excluded_info = ["PAGO CON TARJETA", ""]
             
-            # For BBVA transactions, handle special description concatenation
-            if 'more_info' in df.columns:
-                # List of values to exclude from more_info
-                excluded_info = ["PAGO CON TARJETA", ""]
-                
-                # Combine description and more_info unless more_info is in excluded list
-                def combine_descriptions(row):
-                    desc = row['description'] if not pd.isna(row['description']) else ""
-                    more = row['more_info'] if not pd.isna(row['more_info']) else ""
-                    
-                    # Only append more_info if it's not in excluded list
-                    if more.strip() and more.strip() not in excluded_info:
-                        combined = f"{desc.strip()} {more.strip()}".strip().lower()
-                    else:
-                        combined = desc.strip().lower()
-                    
-                    return combined if combined else "No description"
+            # Combine description and more_info unless more_info is in excluded list
+            def combine_descriptions(row):
+                desc = row['description'] if not pd.isna(row['description']) else ""
+                more = row['more_info'] if not pd.isna(row['more_info']) else ""
                 
-                df['description'] = df.apply(combine_descriptions, axis=1)
+                # Only append more_info if it's not in excluded list
+                if more.strip() and more.strip() not in excluded_info:
+                    combined = f"{desc.strip()} {more.strip()}".strip().lower()
+                else:
+                    combined = desc.strip().lower()
                 
-                # Remove the more_info column as we've combined it with description
-                df = df.drop('more_info', axis=1)
+                return combined if combined else "No description"
             
-            # Replace any NaN values with appropriate defaults
-            df['description'] = df['description'].fillna("No description")
+            df['description'] = df.apply(combine_descriptions, axis=1)
             
-            # Convert number values to float
-            def convert_number(x):
-                if pd.isna(x):
-                    return 0.0
-                return float(x)
+            # Remove the more_info column as we've combined it with description
+            df = df.drop('more_info', axis=1)
+        
+        # Replace any NaN values with appropriate defaults
+        df['description'] = df['description'].fillna("No description")
+        
+        # Convert number values to float
+        def convert_number(x):
+            if pd.isna(x):
+                return 0.0
+            return float(x)
+        
+        df['amount'] = df['amount'].apply(convert_number)
+        if 'balance' in df.columns:
+            df['balance'] = df['balance'].apply(convert_number)
+        
+        if df.empty:
+            return df
+        
+        # Sort transactions by date in ascending order (oldest first)
+        df = df.sort_values('date', ascending=True)
+        
+        # Calculate hashes for all transactions
+        df['uuid'] = df.apply(lambda row: self.create_transaction_hash(row.to_dict()), axis=1)
+        
+        return df
+
+    def split_caixa_export(self, csv_path: str, account_names: List[str]):
+        """Read a Caixa export and split it into one dataframe per account
+        
+        Only rows for account_names are kept. Returns a dict of account name to
+        dataframe and the set of other account names found in the file.
+        """
+        # Read the CSV file in chunks with its known schema, keeping only the requested accounts
+        frames = []
+        skipped_accounts = set()
+        for chunk in pd.read_csv(csv_path, usecols=CAIXA_COLUMNS, dtype=CAIXA_DTYPES, chunksize=CAIXA_READ_CHUNK_SIZE):
+            is_wanted = chunk['account'].isin(account_names)
+            skipped_accounts.update(chunk.loc[~is_wanted, 'account'].dropna().unique())
+            frames.append(chunk[is_wanted])
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CAIXA_COLUMNS)
+        
+        # Split the file into one frame per account in a single pass, grouping on categorical codes
+        df['account'] = df['account'].astype('category')
+        account_frames = dict(tuple(df.groupby('account', sort=False, observed=True)))
+        
+        return account_frames, skipped_accounts
+
+    def find_existing_hashes(self, hashes: List[str]) -> List[str]:
+        """Check which hashes already exist, in small batches to avoid URL too long errors"""
+        hash_batch_size = 100  # Small batch size for hash checking
+        existing_hashes = []
+        
+        for i in range(0, len(hashes), hash_batch_size):
+            batch_hashes = hashes[i:i+hash_batch_size]
+            try:
+                existing_hashes.extend(self.get_existing_transaction_hashes(batch_hashes))
+            except Exception as e:
+                self.logger.warning("Error checking batch %d: %s", i//hash_batch_size, e)
+                # If we can't check, assume none exist and let later duplicate checks handle it
+                pass
+        
+        return existing_hashes
+
+    def ingest_transactions(self, csv_path: str, account_number: str, bank_id: int, account_id: int):
+        """Ingest transactions from CSV file using batch processing"""
+        try:
+            df = pd.read_csv(csv_path, sep=',')
+        except Exception as e:
+            self.logger.error("Error reading transactions from %s: %s", csv_path, e)
+            raise
+        
+        self.ingest_dataframe(df, account_number, bank_id, account_id)
+
+    def ingest_dataframe(self, df: pd.DataFrame, account_number: str, bank_id: int, account_id: int):
+        """Ingest transactions from an already loaded export dataframe using batch processing"""
+        try:
+            # Get or verify account ID
+            account_id = self.get_account(account_number, bank_id, account_id)
             
-            df['amount'] = df['amount'].apply(convert_number)
-            if 'balance' in df.columns:
-                df['balance'] = df['balance'].apply(convert_number)
+            df = self.normalize_transactions(df)
             
             if df.empty:
                 self.logger.info("No transactions to process")
                 return
             
-            # Sort transactions by date in ascending order (oldest first)
-            df = df.sort_values('date', ascending=True)
-            
-            # Calculate hashes for all transactions
-            df['uuid'] = df.apply(lambda row: self.create_transaction_hash(row.to_dict()), axis=1)
-            
             # For large files, we need to check for existing hashes in small batches
             # to avoid URL too long errors
-            self.logger.info(f"Checking for existing transactions in {len(df)} records")
-            
-            hash_batch_size = 100  # Small batch size for hash checking
-            all_hashes = []
-            
-            # Check for existing transactions in smaller batches
-            for i in range(0, len(df), hash_batch_size):
-                batch_hashes = df['uuid'].iloc[i:i+hash_batch_size].tolist()
-                try:
-                    existing_batch = self.get_existing_transaction_hashes(batch_hashes)
-                    all_hashes.extend(existing_batch)
-                except Exception as e:
-                    self.logger.warning(f"Error checking batch {i//hash_batch_size}: {str(e)}")
-                    # If we can't check, assume none exist and let later duplicate checks handle it
-                    pass
+            self.logger.info("Checking for existing transactions in %d records", len(df))
+            all_hashes = self.find_existing_hashes(df['uuid'].tolist())
             
-            self.logger.info(f"Found {len(all_hashes)} existing transactions that will be skipped")
+            self.logger.info("Found %d existing transactions that will be skipped", len(all_hashes))
             
             # Process in smaller batches to avoid URL too long errors
             batch_size = 10  # Even smaller batch size for processing
@@ -244,7 +296,7 @@ class TransactionIngester:
                 if new_transactions.empty:
                     continue
                 
-                self.logger.info(f"Processing batch {i//batch_size + 1}: Found {len(new_transactions)} new transactions")
+                self.logger.info("Processing batch %d: Found %d new transactions", i//batch_size + 1, len(new_transactions))
                 
                 # Process new transactions one by one to handle potential duplicate errors
                 successful_transactions = []
@@ -279,18 +331,179 @@ class TransactionIngester:
                             # Silently skip duplicates
                             pass
                         elif "Token \"NaN\"" in error_msg:
-                            self.logger.warning(f"NaN value detected in transaction: {row_dict}")
+                            self.logger.warning("NaN value detected in transaction: %s", row_dict)
                         else:
-                            self.logger.warning(f"Failed to process transaction: {error_msg}")
+                            self.logger.warning("Failed to process transaction: %s", error_msg)
                 
-                self.logger.info(f"Successfully ingested {len(successful_transactions)} transactions in this batch")
+                self.logger.info("Successfully ingested %d transactions in this batch", len(successful_transactions))
                 total_processed += len(new_transactions)
             
             if total_processed == 0:
                 self.logger.info("No new transactions to ingest")
             else:
-                self.logger.info(f"Completed processing {total_success} out of {total_processed} transactions")
+                self.logger.info("Completed processing %d out of %d transactions", total_success, total_processed)
                 
         except Exception as e:
-            self.logger.error(f"Error in transaction ingestion: {str(e)}")
-            raise
\ No newline at end of file
+            self.logger.error("Error in transaction ingestion: %s", e)
+            raise
+
+    def log_transaction_failure(self, error: Exception, row: Dict[str, Any]):
+        """Report a transaction that could not be written, as the row-by-row ingestion does"""
+        error_msg = str(error)
+        if "duplicate key value" in error_msg:
+            # Silently skip duplicates
+            pass
+        elif "Token \"NaN\"" in error_msg:
+            self.logger.warning("NaN value detected in transaction: %s", row)
+        else:
+            self.logger.warning("Failed to process transaction: %s", error_msg)
+
+    def upsert_transaction_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert transaction rows in one request, falling back to one request per row if it fails
+        
+        Returns the rows the database actually wrote; failing rows are reported and skipped.
+        """
+        try:
+            result = self.supabase.table("transactions")\
+                .upsert(rows, on_conflict="uuid", ignore_duplicates=True)\
+                .execute()
+            return result.data or []
+        except Exception as e:
+            self.logger.warning("Batch of %d transactions failed (%s), retrying one by one", len(rows), e)
+        
+        inserted = []
+        for row in rows:
+            try:
+                result = self.supabase.table("transactions")\
+                    .upsert([row], on_conflict="uuid", ignore_duplicates=True)\
+                    .execute()
+                inserted.extend(result.data or [])
+            except Exception as e:
+                self.log_transaction_failure(e, row)
+        return inserted
+
+    def insert_categories(self, transactions: List[Dict[str, Any]], amounts: Dict[str, float]) -> int:
+        """Insert the default category of each written transaction, one request per row if the batch fails
+        
+        Returns the number of transactions whose category was inserted.
+        """
+        # Only inserted rows are returned, so match categories by uuid rather than position
+        category_data = [
+            self.prepare_transaction_category(transaction["id"], float(amounts[transaction["uuid"]]))
+            for transaction in transactions
+        ]
+        try:
+            self.supabase.table("transaction_categories").insert(category_data).execute()
+            return len(category_data)
+        except Exception as e:
+            self.logger.warning("Batch of %d categories failed (%s), retrying one by one", len(category_data), e)
+        
+        inserted = 0
+        for transaction, category in zip(transactions, category_data):
+            try:
+                self.supabase.table("transaction_categories").insert(category).execute()
+                inserted += 1
+            except Exception as e:
+                self.log_transaction_failure(e, transaction)
+        return inserted
+
+    def insert_transactions_bulk(self, transaction_data: List[Dict[str, Any]], amounts: Dict[str, float]) -> int:
+        """Insert prepared transactions and their default categories using multi-row requests
+        
+        Rows whose uuid already exists are skipped by the database instead of failing
+        the batch. Rows with a missing date or amount are reported and dropped up front, and
+        a batch the database rejects is retried row by row, so one bad row does not sink the
+        rest. amounts maps each transaction uuid to its amount for the category rows.
+        Returns the number of transactions inserted together with their category.
+        """
+        # Drop rows the database would reject (NaT dates serialize as 'NaT', NaN amounts as NaN)
+        valid_data = []
+        for row in transaction_data:
+            if pd.isna(row["operation_date"]) or row["operation_date"] == "NaT" or pd.isna(amounts[row["uuid"]]):
+                self.logger.warning("NaN value detected in transaction: %s", row)
+                continue
+            valid_data.append(row)
+        
+        batch_size = 500
+        total_transactions = len(transaction_data)
+        total_success = 0
+        self.logger.info("Starting bulk import of %d transactions", total_transactions)
+        
+        for i in range(0, len(valid_data), batch_size):
+            batch = valid_data[i:i+batch_size]
+            
+            inserted = self.upsert_transaction_rows(batch)
+            if not inserted:
+                continue
+            
+            total_success += self.insert_categories(inserted, amounts)
+            self.logger.info("Processed batch %d/%d", i//batch_size + 1, (len(valid_data)-1)//batch_size + 1)
+        
+        self.logger.info("Completed bulk import of %d out of %d transactions", total_success, total_transactions)
+        return total_success
+
+    def prepare_new_transactions(self, csv_path: str, account_id: int):
+        """Load a CSV file and prepare the rows that are not in the database yet
+        
+        Returns the prepared transaction rows and a uuid -> amount mapping for them.
+        """
+        df = self.load_transactions(csv_path)
+        
+        if df.empty:
+            self.logger.info("No transactions to process")
+            return [], {}
+        
+        self.logger.info("Checking for existing transactions in %d records", len(df))
+        existing_hashes = self.find_existing_hashes(df['uuid'].tolist())
+        df = df[~df['uuid'].isin(existing_hashes)]
+        
+        transaction_data = [
+            self.prepare_transaction_data(row, account_id)
+            for row in df.to_dict('records')
+        ]
+        return transaction_data, dict(zip(df['uuid'], df['amount']))
+
+    def ingest_many(self, tasks, max_workers: int = 4) -> int:
+        """Ingest several CSV files, preparing them concurrently and inserting them one file at a time
+        
+        tasks is an iterable of (account_config, csv_path) pairs, where account_config holds
+        the account_number, bank_id and account_id of the file. Files are loaded and checked
+        against the database concurrently; each is then inserted in its own multi-row batches,
+        so a file that cannot be loaded or inserted is logged and skipped without affecting
+        the others. Returns the number of files whose rows were ingested.
+        """
+        def prepare_task(task):
+            account_config, csv_path = task
+            try:
+                # Get or verify account ID
+                account_id = self.get_account(
+                    account_config["account_number"],
+                    account_config["bank_id"],
+                    account_config["account_id"]
+                )
+                return self.prepare_new_transactions(csv_path, account_id)
+            except Exception as e:
+                self.logger.error("Error loading transactions from %s: %s", csv_path, e)
+                return None
+        
+        tasks = list(tasks)
+        ingested_files = 0
+        
+        # Parsing overlaps with the account and hash lookups of other files; results keep task order
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for (_, csv_path), prepared in zip(tasks, executor.map(prepare_task, tasks)):
+                if prepared is None:
+                    continue
+                file_data, file_amounts = prepared
+                if not file_data:
+                    self.logger.info("No new transactions to ingest from %s", csv_path)
+                    ingested_files += 1
+                    continue
+                
+                try:
+                    self.insert_transactions_bulk(file_data, file_amounts)
+                    ingested_files += 1
+                except Exception as e:
+                    self.logger.error("Error ingesting transactions from %s: %s", csv_path, e)
+        
+        return ingested_files
@@ -2,7 +2,7 @@ import os
 import logging
 from pathlib import Path
 from datetime import datetime
-from db.historical_transaction_ingester import HistoricalTransactionIngester
+from db.historical_transaction_ingester import HistoricalTransactionIngester, HISTORICAL_BANKS
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,48 +27,28 @@ def setup_logger():
     # Add handler to root logger
     logger.addHandler(console_handler)
 
-def get_account_config(bank, file_path):
-    """Get account configuration based on bank and file"""
-    if bank == "bbva":
-        if "virtual" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("BBVA_BANK_ID")),
-                "account_number": os.getenv("BBVA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("BBVA_ACCOUNT_ID_TYPE_VIRTUAL_ID")),
-            }
-        else:
-            return {
-                "bank_id": int(os.getenv("BBVA_BANK_ID")),
-                "account_number": os.getenv("BBVA_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("BBVA_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    elif bank == "ruralvia":
-        if "virtual" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("RURALVIA_BANK_ID")),
-                "account_number": os.getenv("RURALVIA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("RURALVIA_ACCOUNT_ID_TYPE_VIRTUAL_ID"))
-            }
-        else:
-            return {
-                "bank_id": int(os.getenv("RURALVIA_BANK_ID")),
-                "account_number": os.getenv("RURALVIA_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("RURALVIA_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    elif bank == "santander":
-        if "virtual" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("SANTANDER_BANK_ID")),
-                "account_number": os.getenv("SANTANDER_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("SANTANDER_ACCOUNT_ID_TYPE_VIRTUAL_ID"))
-            }
-        else:
-            return {
-                "bank_id": int(os.getenv("SANTANDER_BANK_ID")),
-                "account_number": os.getenv("SANTANDER_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("SANTANDER_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    return None
+# Environment variable names (bank_id, account_number, account_id) keyed by (bank, is_virtual)
+ACCOUNT_ENV_VARS = {
+    ("bbva", True): ("BBVA_BANK_ID", "BBVA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "BBVA_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("bbva", False): ("BBVA_BANK_ID", "BBVA_ACCOUNT_NUMBER_TYPE_BANK_ID", "BBVA_ACCOUNT_ID_TYPE_BANK_ID"),
+    ("ruralvia", True): ("RURALVIA_BANK_ID", "RURALVIA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "RURALVIA_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("ruralvia", False): ("RURALVIA_BANK_ID", "RURALVIA_ACCOUNT_NUMBER_TYPE_BANK_ID", "RURALVIA_ACCOUNT_ID_TYPE_BANK_ID"),
+    ("santander", True): ("SANTANDER_BANK_ID", "SANTANDER_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "SANTANDER_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("santander", False): ("SANTANDER_BANK_ID", "SANTANDER_ACCOUNT_NUMBER_TYPE_BANK_ID", "SANTANDER_ACCOUNT_ID_TYPE_BANK_ID"),
+}
+
+def get_account_config(bank, filename_lower):
+    """Get account configuration based on bank and the lowercased file name"""
+    env_vars = ACCOUNT_ENV_VARS.get((bank, "virtual" in filename_lower))
+    if not env_vars:
+        return None
+    
+    bank_id_var, account_number_var, account_id_var = env_vars
+    return {
+        "bank_id": int(os.getenv(bank_id_var)),
+        "account_number": os.getenv(account_number_var),
+        "account_id": int(os.getenv(account_id_var)),
+    }
 
 def process_historical_files():
     """Process all historical CSV files"""
@@ -89,13 +69,8 @@ def process_historical_files():
         filename = file_path.name.lower()
         
         # Determine bank and account type from filename
-        if "bbva" in filename:
-            bank = "bbva"
-        elif "ruralvia" in filename:
-            bank = "ruralvia"
-        elif "santander" in filename:
-            bank = "santander"
-        else:
+        bank = next((bank for bank in HISTORICAL_BANKS if bank in filename), None)
+        if bank is None:
             logger.warning(f"Unknown bank in filename: {filename}")
             continue
             
@@ -3,6 +3,8 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 import logging
+import tempfile
+from contextlib import ExitStack
 from pathlib import Path
 from datetime import datetime
 from db.historical_transaction_ingester import HistoricalTransactionIngester
@@ -13,6 +15,9 @@ from uuid import UUID
 
 load_dotenv()
 
+# Per-account CSVs are kept in memory up to this size before spilling to disk
+ACCOUNT_BUFFER_MAX_SIZE = 64 * 1024 * 1024
+
 def setup_logger():
     """Configure the logging system"""
     # Configure root logger
@@ -81,8 +86,11 @@ def create_caixa_transaction_hash(row_dict, account_name, user_id):
     
     return transaction_uuid
 
-def process_caixa_csv_by_account(csv_file_path):
-    """Process CaixaBank CSV file and split transactions by account"""
+def process_caixa_csv_by_account(csv_file_path, stack, spill_dir=None):
+    """Process CaixaBank CSV file and split transactions by account
+    
+    Each account's CSV buffer is registered on the given ExitStack, which closes them all.
+    """
     logger = logging.getLogger(__name__)
     
     # Read the CSV file
@@ -115,20 +123,23 @@ def process_caixa_csv_by_account(csv_file_path):
             logger.warning(f"No configuration found for account: {mapped_account}")
             continue
         
-        # Save account-specific CSV
-        account_csv_path = csv_file_path.replace('.csv', f'_{mapped_account.replace(" ", "_")}.csv')
-        
         # Remove the 'Cuenta' column for processing as it's not needed in the transaction data
         account_df_clean = account_df.drop('Cuenta', axis=1)
-        account_df_clean.to_csv(account_csv_path, index=False, sep=';')
+        
+        # Write the account-specific CSV to a buffer that only touches disk when it grows large
+        account_csv = stack.enter_context(tempfile.SpooledTemporaryFile(
+            max_size=ACCOUNT_BUFFER_MAX_SIZE, mode='w+', newline='', encoding='utf-8', dir=spill_dir
+        ))
+        account_df_clean.to_csv(account_csv, index=False, sep=';')
+        account_csv.seek(0)
         
         results[mapped_account] = {
-            "csv_path": account_csv_path,
+            "csv_file": account_csv,
             "config": account_config,
             "transaction_count": len(account_df_clean)
         }
         
-        logger.info(f"Created account-specific CSV: {account_csv_path}")
+        logger.info(f"Created account-specific CSV buffer for {mapped_account}")
     
     return results
 
@@ -152,42 +163,43 @@ def process_caixa_historical_files():
         logger.warning("No CaixaBank CSV files found in data/csv directory")
         return
     
-    for file_path in caixa_files:
-        logger.info(f"Processing CaixaBank file: {file_path.name}")
-        
-        try:
-            # Process the CSV and split by account
-            account_results = process_caixa_csv_by_account(str(file_path))
+    # Buffers that outgrow memory spill into a per-run directory that is always removed at the end
+    with tempfile.TemporaryDirectory(prefix="caixa_historical_") as spill_dir:
+        for file_path in caixa_files:
+            logger.info(f"Processing CaixaBank file: {file_path.name}")
             
-            # Process each account's transactions
-            for account_name, account_info in account_results.items():
-                total_count += 1
-                
-                try:
-                    logger.info(f"Processing {account_info['transaction_count']} transactions for {account_name}")
+            try:
+                # Every account buffer is closed when this file is done, even if splitting fails partway
+                with ExitStack() as stack:
+                    # Process the CSV and split by account
+                    account_results = process_caixa_csv_by_account(str(file_path), stack, spill_dir)
                     
-                    # Use the enhanced CaixaBank-specific method
-                    ingester.ingest_caixa_transactions(
-                        csv_path=account_info["csv_path"],
-                        account_number=account_info["config"]["account_number"],
-                        bank_id=account_info["config"]["bank_id"],
-                        account_id=account_info["config"]["account_id"],
-                        account_name=account_name  # Pass account name for hash calculation
-                    )
-                    
-                    logger.info(f"Successfully processed {account_name}")
-                    success_count += 1
-                    
-                    # Clean up temporary account-specific CSV
-                    os.remove(account_info["csv_path"])
-                    
-                except ValueError as ve:
-                    logger.error(f"Account error for {account_name}: {str(ve)}")
-                except Exception as e:
-                    logger.error(f"Error processing {account_name}: {str(e)}")
-                    
-        except Exception as e:
-            logger.error(f"Error processing file {file_path.name}: {str(e)}")
+                    # Process each account's transactions
+                    for account_name, account_info in account_results.items():
+                        total_count += 1
+                        
+                        try:
+                            logger.info(f"Processing {account_info['transaction_count']} transactions for {account_name}")
+                            
+                            # Use the enhanced CaixaBank-specific method
+                            ingester.ingest_caixa_transactions(
+                                csv_path=account_info["csv_file"],
+                                account_number=account_info["config"]["account_number"],
+                                bank_id=account_info["config"]["bank_id"],
+                                account_id=account_info["config"]["account_id"],
+                                account_name=account_name  # Pass account name for hash calculation
+                            )
+                            
+                            logger.info(f"Successfully processed {account_name}")
+                            success_count += 1
+                            
+                        except ValueError as ve:
+                            logger.error(f"Account error for {account_name}: {str(ve)}")
+                        except Exception as e:
+                            logger.error(f"Error processing {account_name}: {str(e)}")
+                        
+            except Exception as e:
+                logger.error(f"Error processing file {file_path.name}: {str(e)}")
     
     logger.info(f"Processed {success_count} out of {total_count} accounts successfully")
 
@@ -195,8 +207,8 @@ def process_caixa_historical_files():
 def add_caixa_support_to_ingester():
     """Add CaixaBank-specific processing to the ingester"""
     
-    def ingest_caixa_transactions(self, csv_path: str, account_number: str, bank_id: int, account_id: int, account_name: str):
-        """Ingest CaixaBank transactions from CSV file with account-specific hash calculation"""
+    def ingest_caixa_transactions(self, csv_path, account_number: str, bank_id: int, account_id: int, account_name: str):
+        """Ingest CaixaBank transactions from a CSV path or file object with account-specific hash calculation"""
         try:
             # Get or verify account ID
             account_id = self.get_account(account_number, bank_id, account_id)
@@ -0,0 +1,269 @@
+import argparse
+import logging
+import os
+import re
+import signal
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+def signal_handler(signum, frame):
+    """Handle interrupt signals"""
+    logger.info("Received interrupt signal. Force quitting...")
+    sys.exit(0)
+
+def sanitize_filename(filename: str) -> str:
+    """
+    Sanitize filename by removing invalid characters
+
+    Args:
+        filename (str): Original filename
+
+    Returns:
+        str: Sanitized filename
+    """
+    # Replace asterisks with 'x'
+    filename = filename.replace('*', 'x')
+
+    # Remove any other invalid characters
+    invalid_chars = r'[<>:"/\\|?]'
+    return re.sub(invalid_chars, '', filename)
+
+def save_transactions_to_csv(accounts, output_dir: str = "data/exports") -> None:
+    """
+    Save account transactions to CSV files
+
+    Args:
+        accounts (list): List of account dictionaries containing transactions
+        output_dir (str): Directory to save CSV files
+    """
+    # Create output directory if it doesn't exist
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    for account in accounts:
+        # Sanitize the filename
+        raw_filename = f"{timestamp}_ruralvia_{account['_slug']}_{account['_short_num']}.csv"
+        filename = sanitize_filename(raw_filename)
+        filepath = os.path.join(output_dir, filename)
+
+        transactions = account.get('transactions', [])
+        if not transactions:
+            continue
+
+        # Define CSV headers based on available transaction data
+        headers = ['date', 'description', 'category', 'amount']
+        if 'balance' in transactions[0]:
+            headers.append('balance')
+
+        logger.info(f"Saving {len(transactions)} transactions to {filename}")
+
+        # Format dates and write the whole account in one vectorized pass
+        df = pd.DataFrame.from_records(transactions, columns=headers)
+        df = df.sort_values('date', ascending=False, kind='stable')
+        df.to_csv(filepath, index=False, encoding='utf-8', date_format='%Y-%m-%d %H:%M:%S')
+
+        logger.info(f"Successfully saved transactions to {filepath}")
+
+def run_bbva(since_days: int) -> None:
+    """Log into BBVA, capture bank and virtual card transactions and export them"""
+    from scrapers.bbva_scraper import BBVAScraperImproved
+
+    logger.info(f"Starting BBVA scraper")
+    debugger_address = os.getenv("DEBUGGER_ADDRESS")
+    # Initialize and run the scraper
+    with BBVAScraperImproved(debugger_address) as scraper:
+        logger.info("Starting BBVA login process")
+        success_login = scraper.login()
+        if success_login:
+            # First click on accounts overview
+            success = scraper.click_accounts_overview()
+            if success:
+                logger.info("Successfully clicked accounts overview")
+
+                # Click on bank transactions
+                success = scraper.click_bank_transactions()
+                if success:
+                    logger.info("Successfully clicked bank transactions")
+                    # Wait until the account transactions response has been captured
+                    if not scraper.wait_for_capture("accountTransactions"):
+                        logger.warning("Timed out waiting for bank transactions response")
+
+                    # Go back to accounts overview
+                    success = scraper.click_accounts_overview()
+                    if success:
+                        logger.info("Successfully went back to accounts overview")
+
+                        # Click on virtual card transactions
+                        success = scraper.click_virtual_card_transactions()
+                        if success:
+                            logger.info("Successfully clicked virtual card transactions")
+                            # Wait until the card transactions response has been captured
+                            if not scraper.wait_for_capture("listIntegratedCardTransactions"):
+                                logger.warning("Timed out waiting for virtual card transactions response")
+
+                            # Export transactions to CSV
+                            logger.info("Exporting transactions to CSV")
+                            if scraper.export_transactions_to_csv():
+                                logger.info("Successfully exported transactions to CSV")
+                            else:
+                                logger.error("Failed to export transactions to CSV")
+                        else:
+                            logger.error("Failed to click virtual card transactions")
+                    else:
+                        logger.error("Failed to go back to accounts overview")
+                else:
+                    logger.error("Failed to click bank transactions")
+            else:
+                logger.error("Failed to click accounts overview")
+        else:
+            logger.error("Failed to log into BBVA")
+
+def run_caixa(since_days: int) -> None:
+    """Run the Caixa scraper, which exports its own CSV"""
+    from scrapers.caixa_scraper import CaixaScraper
+
+    try:
+        logger.info("Starting Caixa scraper...")
+        debugger_address = os.getenv("DEBUGGER_ADDRESS")
+        scraper = CaixaScraper(debugger_address=debugger_address)
+        scraper.scrape()
+        logger.info("Caixa scraper finished successfully.")
+    except Exception as e:
+        logger.critical(f"An unhandled error occurred: {e}", exc_info=True)
+
+def run_ruralvia(since_days: int) -> None:
+    """Run the Ruralvia scraper and report the result"""
+    start_date = datetime.now() - timedelta(days=since_days)
+    success = run_ruralvia_scraper(start_date)
+
+    if success:
+        print("\nScraping completed successfully!")
+    else:
+        print("\nScraping failed. Check the logs for details.")
+
+def run_ruralvia_scraper(start_date: Optional[datetime] = None) -> bool:
+    """
+    Run the Ruralvia scraper to fetch accounts and transactions
+
+    Args:
+        start_date (datetime, optional): Start date for transaction fetch.
+            Defaults to 30 days ago if not provided.
+
+    Returns:
+        bool: True if scraping was successful, False otherwise
+    """
+    from scrapers.ruralvia_scraper import RuralviaScraper
+
+    try:
+        # If no start date provided, default to 30 days ago
+        if not start_date:
+            start_date = datetime.now() - timedelta(days=30)
+
+        logger.info(f"Starting Ruralvia scraper from date: {start_date}")
+        debugger_address = os.getenv("DEBUGGER_ADDRESS")
+
+        with RuralviaScraper(debugger_address) as scraper:
+
+            # Attempt login
+            if not scraper.login():
+                logger.error("Failed to login to Ruralvia")
+                return False
+
+            # Get accounts and their transactions
+            accounts = scraper.get_accounts()
+            if not accounts:
+                logger.warning("No accounts found")
+                return False
+
+            logger.info(f"Found {len(accounts)} accounts")
+
+            # Save transactions to CSV files
+            save_transactions_to_csv(accounts)
+
+            # Print account information
+            for i, account in enumerate(accounts, 1):
+                print(f"\n{'='*100}")
+                print(f"Account {i}: {account['name']}")
+                print(f"{'='*100}")
+                print(f"Number: {account['account_number']}")
+                print(f"Type: {account['type'].value}")
+                print(f"Balance: {account['balance']}€")
+
+                transactions = account.get('transactions', [])
+                if transactions:
+                    print(f"\nTransactions ({len(transactions)}):")
+                    print(f"{'-'*100}")
+                    print(f"{'Date':<20} {'Description':<40} {'Category':<20} {'Amount':>10} {'Balance':>12}")
+                    print(f"{'-'*100}")
+
+                    for trans in sorted(transactions, key=lambda x: x['date'], reverse=True):
+                        date_str = trans['date'].strftime('%Y-%m-%d %H:%M:%S')
+                        desc = trans['description'][:37] + '...' if len(trans['description']) > 37 else trans['description']
+                        category = trans['category'][:17] + '...' if len(trans['category']) > 17 else trans['category']
+                        amount = f"{trans['amount']:,.2f}€"
+                        balance = f"{trans.get('balance', 0):,.2f}€" if 'balance' in trans else ''
+
+                        print(f"{date_str:<20} {desc:<40} {category:<20} {amount:>10} {balance:>12}")
+                else:
+                    print("\nNo transactions found for this account")
+
+                print(f"\n{'='*100}")
+
+        logger.info("Scraping completed successfully")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error during scraping: {str(e)}")
+        logger.exception("Detailed error:")
+        return False
+
+# Scraper flows by bank; each receives the number of days of history to fetch
+SCRAPERS = {
+    "bbva": run_bbva,
+    "caixa": run_caixa,
+    "ruralvia": run_ruralvia,
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a bank scraper and export its transactions to CSV")
+    parser.add_argument("--bank", required=True, choices=sorted(SCRAPERS), help="Bank to scrape")
+    parser.add_argument("--since-days", type=int, default=60,
+                        help="Days of history to fetch where the bank supports it (default: 60)")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    # Set up signal handlers
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        SCRAPERS[args.bank](args.since_days)
+        return 0
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt. Exiting...")
+        return 0
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,251 +1,202 @@
 import os
+import re
 import logging
-import pandas as pd
-import tempfile
-from pathlib import Path
-from datetime import datetime
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from db.transaction_ingester import TransactionIngester
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Export filenames look like YYYYMMDD[_HHMMSS]_<bank>_..., e.g. 20250101_120000_bbva_cuentas_personales.csv
+EXPORT_FILE_RE = re.compile(r"(\d{8})(?:_(\d{6}))?_.+\.csv")
+# Banks detected from the filename, checked in this order when a name mentions more than one
+EXPORT_BANKS = ("bbva", "ruralvia", "caixa")
+VIRTUAL_FILE_RE = re.compile(r"virtual_card|tarjeta_virtual", re.IGNORECASE)
+
+# Number of Caixa accounts ingested concurrently
+CAIXA_MAX_WORKERS = 4
+
 def setup_logger():
     """Configure the logging system"""
-    # Configure root logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
+    # Configure root logger with a single console handler
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        force=True,
+    )
     
     # Set higher log level for HTTP-related loggers
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
-    
-    # Console handler only
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handler to root logger
-    logger.addHandler(console_handler)
+
+def load_account_config(bank_id_var, account_number_var, account_id_var):
+    """Read an account configuration from the environment, or None if any variable is missing"""
+    bank_id = os.getenv(bank_id_var)
+    account_number = os.getenv(account_number_var)
+    account_id = os.getenv(account_id_var)
+    if not (bank_id and account_number and account_id):
+        return None
+    return {
+        "bank_id": int(bank_id),
+        "account_number": account_number,
+        "account_id": int(account_id),
+    }
+
+# Filename markers that identify each account subtype, checked in order
+ACCOUNT_SUBTYPE_MARKERS = {
+    "bbva": (("virtual_card", "virtual"), ("cuentas_personales", "regular")),
+    "ruralvia": (("tarjeta_virtual", "virtual"), ("ahorro_menores", "regular")),
+    "santander": (("tarjeta_virtual", "virtual"), ("cuenta_personal", "regular")),
+}
+
+# Environment variables don't change during a run, so read them once
+ACCOUNT_CONFIGS = {
+    ("bbva", "virtual"): load_account_config("BBVA_BANK_ID", "BBVA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "BBVA_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("bbva", "regular"): load_account_config("BBVA_BANK_ID", "BBVA_ACCOUNT_NUMBER_TYPE_BANK_ID", "BBVA_ACCOUNT_ID_TYPE_BANK_ID"),
+    ("ruralvia", "virtual"): load_account_config("RURALVIA_BANK_ID", "RURALVIA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "RURALVIA_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("ruralvia", "regular"): load_account_config("RURALVIA_BANK_ID", "RURALVIA_ACCOUNT_NUMBER_TYPE_BANK_ID", "RURALVIA_ACCOUNT_ID_TYPE_BANK_ID"),
+    ("santander", "virtual"): load_account_config("SANTANDER_BANK_ID", "SANTANDER_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID", "SANTANDER_ACCOUNT_ID_TYPE_VIRTUAL_ID"),
+    ("santander", "regular"): load_account_config("SANTANDER_BANK_ID", "SANTANDER_ACCOUNT_NUMBER_TYPE_BANK_ID", "SANTANDER_ACCOUNT_ID_TYPE_BANK_ID"),
+}
+
+# Map account names from the Caixa CSV to their configuration
+CAIXA_ACCOUNT_CONFIGS = {
+    "Cuenta 1433": load_account_config("CAIXA_BANK_ID", "CAIXA_ACCOUNT_NUMBER_TYPE_BANK_CUENTA_1433", "CAIXA_ACCOUNT_ID_TYPE_BANK_CUENTA_1433"),
+    "MyCard 3363": load_account_config("CAIXA_BANK_ID", "CAIXA_ACCOUNT_NUMBER_TYPE_CARD_DEN_3363", "CAIXA_ACCOUNT_ID_TYPE_CARD_DEN_3363"),
+    "MyCard 5246": load_account_config("CAIXA_BANK_ID", "CAIXA_ACCOUNT_NUMBER_TYPE_CARD_PAU_5246", "CAIXA_ACCOUNT_ID_TYPE_CARD_PAU_5246"),
+    "CYBERTARJETA 2526": load_account_config("CAIXA_BANK_ID", "CAIXA_ACCOUNT_NUMBER_TYPE_CARD_CYBER_2526", "CAIXA_ACCOUNT_ID_TYPE_CARD_CYBER_2526"),
+}
 
 def get_latest_files_by_bank(exports_dir):
     """Get the most recent file for each bank and account type from the exports directory"""
-    exports_path = Path(exports_dir)
-    if not exports_path.exists():
+    if not os.path.isdir(exports_dir):
         raise ValueError(f"Exports directory not found: {exports_dir}")
     
-    # Dictionary to store latest files by bank and account type
-    latest_files = {}
+    # Latest (timestamp, path, filename, bank, account_type, subtype) by bank and account type
+    latest = {}
     
-    # Process all CSV files
-    for file_path in exports_path.glob("*.csv"):
-        filename = file_path.name
-        try:
-            # Extract both date and time from filename
-            parts = filename.split("_")
-            if len(parts) >= 2:
-                date_str = parts[0]
-                time_str = parts[1]
-                try:
-                    # Parse date and time together
-                    timestamp = datetime.strptime(f"{date_str}_{time_str}", "%Y%m%d_%H%M%S")
-                except ValueError:
-                    # Fallback to date only if time parsing fails
-                    timestamp = datetime.strptime(date_str, "%Y%m%d")
-            else:
-                # Fallback for files without time component
-                timestamp_str = filename.split("_")[0]
-                timestamp = datetime.strptime(timestamp_str, "%Y%m%d")
-            
-            # Extract bank name from filename
-            if "bbva" in filename.lower():
-                bank = "bbva"
-            elif "ruralvia" in filename.lower():
-                bank = "ruralvia"
-            elif "caixa" in filename.lower():
-                bank = "caixa"
-            else:
+    with os.scandir(exports_dir) as entries:
+        for entry in entries:
+            filename = entry.name
+            match = EXPORT_FILE_RE.fullmatch(filename)
+            if not match:
                 continue
+            date_str, time_str = match.groups()
+            # The pattern only guarantees digits: skip names whose date or time is not a real one
+            try:
+                date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:]))
+            except ValueError:
+                continue
+            if time_str and not (time_str[:2] < "24" and time_str[2:4] < "60" and time_str[4:] < "60"):
+                continue
+            # YYYYMMDD[HHMMSS] as an integer orders chronologically; date-only files count as midnight
+            timestamp = int(date_str + (time_str or "000000"))
             
-            # Handle Caixa differently - all accounts in one file
-            if bank == "caixa":
-                # For Caixa, we'll process the file once and handle multiple accounts within it
-                key = f"{bank}_all_accounts"
-                if key not in latest_files or timestamp > latest_files[key]["timestamp"]:
-                    latest_files[key] = {
-                        "file": str(file_path),
-                        "timestamp": timestamp,
-                        "filename": filename,
-                        "bank": bank,
-                        "account_type": "all_accounts"
-                    }
+            filename_lower = filename.lower()
+            bank = next((bank for bank in EXPORT_BANKS if bank in filename_lower), None)
+            if bank is None:
                 continue
             
-            # Determine account type for other banks
-            if "virtual_card" in filename.lower() or "tarjeta_virtual" in filename.lower():
+            # Caixa exports hold all accounts in one file
+            if bank == "caixa":
+                account_type = "all_accounts"
+            elif VIRTUAL_FILE_RE.search(filename):
                 account_type = "virtual"
             else:
                 account_type = "regular"
             
-            # Create a unique key for each bank and account type combination
+            # Resolve which configured account the file belongs to while the name is at hand
+            subtype = next(
+                (subtype for marker, subtype in ACCOUNT_SUBTYPE_MARKERS.get(bank, ()) if marker in filename_lower),
+                None
+            )
+            
+            # Keep the newest file for each bank and account type combination
             key = f"{bank}_{account_type}"
-                
-            # Update latest file if this one is newer
-            if key not in latest_files or timestamp > latest_files[key]["timestamp"]:
-                latest_files[key] = {
-                    "file": str(file_path),
-                    "timestamp": timestamp,
-                    "filename": filename,
-                    "bank": bank,
-                    "account_type": account_type
-                }
-        except ValueError:
-            continue
+            if key not in latest or timestamp > latest[key][0]:
+                latest[key] = (timestamp, os.path.join(exports_dir, filename), filename, bank, account_type, subtype)
     
-    return latest_files
+    return {
+        key: {
+            "file": path,
+            "timestamp": timestamp,
+            "filename": filename,
+            "bank": bank,
+            "account_type": account_type,
+            "subtype": subtype
+        }
+        for key, (timestamp, path, filename, bank, account_type, subtype) in latest.items()
+    }
 
-def get_account_config(bank, file_path):
-    """Get account configuration based on bank and file"""
-    if bank == "bbva":
-        if "virtual_card" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("BBVA_BANK_ID")),
-                "account_number": os.getenv("BBVA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("BBVA_ACCOUNT_ID_TYPE_VIRTUAL_ID")),
-            }
-        elif "cuentas_personales" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("BBVA_BANK_ID")),
-                "account_number": os.getenv("BBVA_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("BBVA_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    elif bank == "ruralvia":
-        if "tarjeta_virtual" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("RURALVIA_BANK_ID")),
-                "account_number": os.getenv("RURALVIA_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("RURALVIA_ACCOUNT_ID_TYPE_VIRTUAL_ID"))
-            }
-        elif "ahorro_menores" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("RURALVIA_BANK_ID")),
-                "account_number": os.getenv("RURALVIA_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("RURALVIA_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    elif bank == "santander":
-        if "tarjeta_virtual" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("SANTANDER_BANK_ID")),
-                "account_number": os.getenv("SANTANDER_ACCOUNT_NUMBER_TYPE_VIRTUAL_ID"),
-                "account_id": int(os.getenv("SANTANDER_ACCOUNT_ID_TYPE_VIRTUAL_ID"))
-            }
-        elif "cuenta_personal" in file_path.lower():
-            return {
-                "bank_id": int(os.getenv("SANTANDER_BANK_ID")),
-                "account_number": os.getenv("SANTANDER_ACCOUNT_NUMBER_TYPE_BANK_ID"),
-                "account_id": int(os.getenv("SANTANDER_ACCOUNT_ID_TYPE_BANK_ID")),
-            }
-    elif bank == "caixa":
-        # For Caixa, we need to handle multiple accounts in one file
-        # This will be handled separately in process_caixa_transactions
-        return None
-    return None
+def get_account_config(bank, subtype):
+    """Get account configuration based on bank and the account subtype detected from the filename"""
+    # Caixa files hold several accounts and are handled in process_caixa_transactions
+    return ACCOUNT_CONFIGS.get((bank, subtype))
 
-def process_caixa_transactions(csv_path):
-    """Process Caixa transactions by grouping them by account and processing each separately"""
+def process_caixa_account(ingester, account_name, account_transactions):
+    """Ingest the transactions of a single Caixa account, returning True on success"""
     logger = logging.getLogger(__name__)
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_path)
+        # Get account configuration based on account name
+        account_config = get_caixa_account_config(account_name)
+        if not account_config:
+            logger.warning("No account configuration found for %s", account_name)
+            return False
+        
+        logger.info("Processing %s (%d transactions)", account_name, len(account_transactions))
         
-        # Group transactions by account
-        account_groups = df.groupby('account')
+        # Ingest the account's rows directly, without a temporary CSV round trip
+        ingester.ingest_dataframe(
+            account_transactions,
+            account_number=account_config["account_number"],
+            bank_id=account_config["bank_id"],
+            account_id=account_config["account_id"]
+        )
         
-        # Initialize ingester
-        ingester = TransactionIngester()
+        logger.info("Successfully processed %s", account_name)
+        return True
         
-        success_count = 0
-        total_accounts = len(account_groups)
+    except Exception as e:
+        logger.error("Error processing account %s: %s", account_name, e)
+        return False
+
+def process_caixa_transactions(csv_path, ingester):
+    """Process Caixa transactions by grouping them by account and processing each separately"""
+    logger = logging.getLogger(__name__)
+    
+    try:
+        # Split the file into one frame per configured account
+        configured_accounts = [name for name, config in CAIXA_ACCOUNT_CONFIGS.items() if config]
+        account_frames, skipped_accounts = ingester.split_caixa_export(csv_path, configured_accounts)
         
-        logger.info(f"Processing Caixa transactions for {total_accounts} accounts")
+        for account_name in sorted(skipped_accounts):
+            logger.warning("No account configuration found for %s", account_name)
         
-        for account_name, account_transactions in account_groups:
-            try:
-                # Get account configuration based on account name
-                account_config = get_caixa_account_config(account_name)
-                if not account_config:
-                    logger.warning(f"No account configuration found for {account_name}")
-                    continue
-                
-                # Create a temporary CSV file for this account
-                temp_csv_path = create_temp_csv_for_account(account_transactions, account_name)
-                
-                logger.info(f"Processing {account_name} ({len(account_transactions)} transactions)")
-                
-                # Ingest transactions for this account
-                ingester.ingest_transactions(
-                    csv_path=temp_csv_path,
-                    account_number=account_config["account_number"],
-                    bank_id=account_config["bank_id"],
-                    account_id=account_config["account_id"]
-                )
-                
-                logger.info(f"Successfully processed {account_name}")
-                success_count += 1
-                
-                # Clean up temporary file
-                os.remove(temp_csv_path)
-                
-            except Exception as e:
-                logger.error(f"Error processing account {account_name}: {str(e)}")
+        total_accounts = len(account_frames)
+        
+        logger.info("Processing Caixa transactions for %d accounts", total_accounts)
         
-        logger.info(f"Processed {success_count} out of {total_accounts} Caixa accounts successfully")
+        # Accounts are independent, so overlap their database round trips
+        with ThreadPoolExecutor(max_workers=CAIXA_MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(process_caixa_account, ingester, account_name, account_transactions)
+                for account_name, account_transactions in account_frames.items()
+            ]
+            success_count = sum(1 for future in as_completed(futures) if future.result())
+        
+        logger.info("Processed %d out of %d Caixa accounts successfully", success_count, total_accounts)
         return success_count
         
     except Exception as e:
-        logger.error(f"Error reading Caixa CSV file: {str(e)}")
+        logger.error("Error reading Caixa CSV file: %s", e)
         raise
 
 def get_caixa_account_config(account_name):
     """Get Caixa account configuration based on account name from CSV"""
-    # Map account names from CSV to environment variables
-    account_mapping = {
-        "Cuenta 1433": {
-            "bank_id": int(os.getenv("CAIXA_BANK_ID")),
-            "account_number": os.getenv("CAIXA_ACCOUNT_NUMBER_TYPE_BANK_CUENTA_1433"),
-            "account_id": int(os.getenv("CAIXA_ACCOUNT_ID_TYPE_BANK_CUENTA_1433")),
-        },
-        "MyCard 3363": {
-            "bank_id": int(os.getenv("CAIXA_BANK_ID")),
-            "account_number": os.getenv("CAIXA_ACCOUNT_NUMBER_TYPE_CARD_DEN_3363"),
-            "account_id": int(os.getenv("CAIXA_ACCOUNT_ID_TYPE_CARD_DEN_3363")),
-        },
-        "MyCard 5246": {
-            "bank_id": int(os.getenv("CAIXA_BANK_ID")),
-            "account_number": os.getenv("CAIXA_ACCOUNT_NUMBER_TYPE_CARD_PAU_5246"),
-            "account_id": int(os.getenv("CAIXA_ACCOUNT_ID_TYPE_CARD_PAU_5246")),
-        },
-        "CYBERTARJETA 2526": {
-            "bank_id": int(os.getenv("CAIXA_BANK_ID")),
-            "account_number": os.getenv("CAIXA_ACCOUNT_NUMBER_TYPE_CARD_CYBER_2526"),
-            "account_id": int(os.getenv("CAIXA_ACCOUNT_ID_TYPE_CARD_CYBER_2526")),
-        }
-    }
-    
-    return account_mapping.get(account_name)
-
-def create_temp_csv_for_account(account_transactions, account_name):
-    """Create a temporary CSV file for a specific account"""
-    
-    # Create a temporary file path
-    temp_file_path = tempfile.mktemp(suffix='.csv')
-    
-    # Use pandas to write the CSV with proper quoting to handle commas in fields
-    account_transactions.to_csv(temp_file_path, index=False, quoting=1)  # quoting=1 means QUOTE_ALL
-    
-    return temp_file_path
+    return CAIXA_ACCOUNT_CONFIGS.get(account_name)
 
 def process_account_files():
     """Process all account transaction files"""
@@ -259,37 +210,38 @@ def process_account_files():
     success_count = 0
     total_count = len(latest_files)
     
+    # Files of the other banks are collected, prepared concurrently and inserted file by file
+    tasks = []
+    
     for bank_account_key, file_info in latest_files.items():
         try:
             # Handle Caixa files differently
             if file_info["bank"] == "caixa":
-                logger.info(f"Processing Caixa file: {file_info['filename']}")
-                caixa_success_count = process_caixa_transactions(file_info["file"])
+                logger.info("Processing Caixa file: %s", file_info["filename"])
+                caixa_success_count = process_caixa_transactions(file_info["file"], ingester)
                 success_count += 1 if caixa_success_count > 0 else 0
                 continue
             
-            # Handle other banks as before
-            account_config = get_account_config(file_info["bank"], file_info["file"])
+            account_config = get_account_config(file_info["bank"], file_info["subtype"])
             if not account_config:
-                logger.warning(f"No account configuration found for {file_info['filename']}")
+                logger.warning("No account configuration found for %s", file_info["filename"])
                 continue
                 
-            logger.info(f"Processing {file_info['filename']} for {account_config['account_number']} ({file_info['account_type']})")
-            ingester.ingest_transactions(
-                csv_path=file_info["file"],
-                account_number=account_config["account_number"],
-                bank_id=account_config["bank_id"],
-                account_id=account_config["account_id"]
-            )
-            logger.info(f"Successfully processed {account_config['account_number']} ({file_info['account_type']})")
-            success_count += 1
+            logger.info("Queued %s for %s (%s)", file_info["filename"], account_config["account_number"], file_info["account_type"])
+            tasks.append((account_config, file_info["file"]))
             
         except ValueError as ve:
-            logger.error(f"Account error for {file_info['filename']}: {str(ve)}")
+            logger.error("Account error for %s: %s", file_info["filename"], ve)
+        except Exception as e:
+            logger.error("Error processing %s: %s", file_info["filename"], e)
+    
+    if tasks:
+        try:
+            success_count += ingester.ingest_many(tasks)
         except Exception as e:
-            logger.error(f"Error processing {file_info['filename']}: {str(e)}")
+            logger.error("Error ingesting account files: %s", e)
     
-    logger.info(f"Processed {success_count} out of {total_count} accounts successfully")
+    logger.info("Processed %d out of %d accounts successfully", success_count, total_count)
 
 def main():
     # Setup logging
@@ -300,7 +252,7 @@ def main():
         process_account_files()
         logger.info("Transaction ingestion completed")
     except Exception as e:
-        logger.error(f"Error during transaction processing: {str(e)}")
+        logger.error("Error during transaction processing: %s", e)
         raise
 
 if __name__ == "__main__":
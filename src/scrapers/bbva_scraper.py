@@ -1,21 +1,43 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import (
+    TimeoutException,
+    JavascriptException,
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+)
+import base64
+import itertools
 import logging
 import os
+import re
 from typing import Optional, List, Dict, Any
 import time
 import json
+import pandas as pd
 import websocket
 import requests
-from threading import Event
+from threading import Event, Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from dataclasses import dataclass
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+
+try:
+    # orjson parses CDP frames and response bodies, and encodes outgoing commands, considerably faster;
+    # stdlib json is the fallback. orjson encodes to UTF-8 bytes, which websocket-client sends as a text frame as-is
+    from orjson import loads as json_loads, dumps as json_dumps
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
 
 # Load environment variables
 load_dotenv()
@@ -28,7 +50,149 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Date format used in exported CSV files
+EXPORT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+EXPORT_DIR = os.path.join("data", "exports")
+
+# Matches a +HHMM/-HHMM offset at the end of a timestamp so it can be rewritten as +HH:MM
+TZ_OFFSET_RE = re.compile(r"([+-]\d{2})(\d{2})$")
+
+# URL markers of the responses whose bodies we capture; each is the key of its handler in response_handlers
+RESPONSE_KINDS = ("listIntegratedCardTransactions", "accountTransactions", "financial-overview")
+
+# Matches the URLs whose bodies we capture; the group is the key of the handler in response_handlers
+RESPONSE_URL_RE = re.compile("(" + "|".join(map(re.escape, RESPONSE_KINDS)) + ")")
+
+# Card products exported as virtual cards
+VIRTUAL_CARD_PRODUCTS = frozenset({"TARJETAS VIRTUALES"})
+
+# Portal page behind the login
+DASHBOARD_URL = "https://web.bbva.es/index.html"
+
+# Session cookies saved after a successful login and reused while fresh, so later runs skip the login form
+SESSION_COOKIES_PATH = os.path.join("data", "sessions", "bbva_cookies.json")
+SESSION_MAX_AGE = 8 * 3600  # seconds
+SESSION_COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+# Resource types the scraper never reads, failed in its tab to speed up page loads
+BLOCKED_RESOURCE_TYPES = ("Image", "Font", "Media")
+
+# Fetch interception patterns: captured API responses pause once they arrive, blocked resources
+# pause before they are sent. No other request reaches the WebSocket
+FETCH_PATTERNS = [
+    {"urlPattern": f"*{kind}*", "requestStage": "Response"} for kind in RESPONSE_KINDS
+] + [
+    {"urlPattern": "*", "resourceType": resource_type, "requestStage": "Request"}
+    for resource_type in BLOCKED_RESOURCE_TYPES
+]
+
+# Locators for the login flow and the navigation helpers, built once per process
+LOGIN_FORM_TOKEN = (By.CSS_SELECTOR, "[data-testid='login-form-token']")
+LOGIN_FORM = (By.CSS_SELECTOR, "[data-testid='login-form']")
+USERNAME_INPUT = (By.ID, "input-user")
+PASSWORD_INPUT = (By.ID, "input-password")
+LOGIN_SUBMIT = (By.CSS_SELECTOR, "span[data-testid='login-form-submit']")
+LOGIN_SUBMIT_BY_CLASS = "span.c-button--secondary"
+ENTENDIDO_BUTTON = (By.CSS_SELECTOR, "div[role='dialog'] #entendido")
+ACCOUNTS_OVERVIEW = (By.ID, "cuentasTarjetasProductos")
+ACCOUNT_ROW = (By.CSS_SELECTOR, "tr.filaCuentasIban")
+ACCOUNT_TRANSACTIONS = (By.CLASS_NAME, "c-tablas-producto")
+VIRTUAL_CARD_ROW = (By.XPATH, "//span[contains(@class, 'nombreComercial') and contains(text(), 'TARJETAS VIRTUALES')]/ancestor::tr")
+CARD_TRANSACTIONS = (By.CSS_SELECTOR, "[data-testid='cards-main-transactions']")
+DASHBOARD_SELECTOR = ".c-data-amount"
+DASHBOARD = (By.CSS_SELECTOR, DASHBOARD_SELECTOR)
+
+# Poll interval (seconds) for login waits that usually resolve in well under the default 0.5 s
+FAST_POLL_FREQUENCY = 0.1
+
+# Sets the username (skipped when null, as in the cookie-based form) and password, firing the
+# input/change events the form listens to, then blurs the password field so the form validates
+FILL_CREDENTIALS_JS = """
+const fill = (id, value) => {
+    const field = document.getElementById(id);
+    field.focus();
+    field.value = value;
+    field.dispatchEvent(new Event('input', {bubbles: true}));
+    field.dispatchEvent(new Event('change', {bubbles: true}));
+    return field;
+};
+if (arguments[0] !== null) fill('input-user', arguments[0]).blur();
+fill('input-password', arguments[1]).blur();
+"""
+
+# Click failures worth retrying with the next click method; anything else (a lost session, a stale
+# element) fails the same way on every method, so it goes straight to the caller
+CLICK_FALLBACK_EXCEPTIONS = (JavascriptException, ElementClickInterceptedException, ElementNotInteractableException)
+
+# Scrolls an element into view and clicks it; scrollIntoView is synchronous, so no delay is needed in between
+SCROLL_AND_CLICK_JS = "arguments[0].scrollIntoView({block: 'center'}); arguments[0].click();"
+
+# Scrolls to and clicks the element matching a CSS selector (formatted in as a JSON string); evaluates to
+# false when nothing matches
+CDP_CLICK_JS = """
+(() => {
+    const element = document.querySelector(%s);
+    if (!element) return false;
+    element.scrollIntoView(true);
+    element.click();
+    return true;
+})()
+"""
+
+# Returns the first element matching a CSS selector whose text contains a string, or null. Lets the
+# browser's selector engine narrow the candidates instead of evaluating an XPath text() predicate
+FIND_BY_TEXT_JS = """
+for (const element of document.querySelectorAll(arguments[0])) {
+    if (element.textContent.includes(arguments[1])) return element;
+}
+return null;
+"""
+
+# Calls back with the index of the first of a list of CSS selectors that matches, or -1 once the
+# timeout (ms) expires. Runs in the browser and re-checks on every DOM mutation, so it answers as
+# soon as the node is inserted instead of on the next poll. It lives in the current page's JS context
+# and is aborted by a navigation, so only use it for waits on an already-loaded page
+WAIT_FOR_ANY_JS = """
+const selectors = arguments[0];
+const done = arguments[arguments.length - 1];
+const match = () => selectors.findIndex(selector => document.querySelector(selector) !== null);
+const found = match();
+if (found >= 0) return done(found);
+let timer;
+const observer = new MutationObserver(() => {
+    const index = match();
+    if (index >= 0) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(index);
+    }
+});
+observer.observe(document.documentElement, {childList: true, subtree: true});
+timer = setTimeout(() => { observer.disconnect(); done(-1); }, arguments[1]);
+"""
+
+def fast_wait(driver, timeout: float) -> WebDriverWait:
+    """WebDriverWait polling every 100 ms instead of 500 ms, for conditions that usually resolve within a second"""
+    return WebDriverWait(driver, timeout, poll_frequency=FAST_POLL_FREQUENCY)
+
+def parse_bbva_datetime(date_str: str) -> datetime:
+    """Parse a BBVA timestamp such as 2025-03-11T00:00:00.000+0100 keeping its timezone"""
+    # Python 3.11+ parses Z and +0100 offsets natively, without building intermediate strings
+    try:
+        return datetime.fromisoformat(date_str)
+    except ValueError:
+        pass
+    # Older versions need Z as +00:00 and the offset as +01:00
+    if date_str.endswith('Z'):
+        date_str = date_str[:-1] + '+00:00'
+    return datetime.fromisoformat(TZ_OFFSET_RE.sub(r"\1:\2", date_str))
+
+@lru_cache(maxsize=4096)
+def title_case(name: str) -> str:
+    """Title-case a shop name; the same few merchants repeat across a statement, so results are cached"""
+    return name.title()
+
+@dataclass(slots=True)
 class Transaction:
     date: datetime
     description: str
@@ -38,7 +202,7 @@ class Transaction:
     balance: float = 0.0  # Added balance field for bank account transactions
     more_info: str = ""  # Added more info field for extended description
 
-@dataclass
+@dataclass(slots=True)
 class AccountBalance:
     account_number: str
     account_type: str
@@ -46,7 +210,7 @@ class AccountBalance:
     current_balance: float
     currency: str = "EUR"
 
-@dataclass
+@dataclass(slots=True)
 class CardInfo:
     card_number: str
     alias: str
@@ -64,180 +228,194 @@ class ResponseHandler:
         """Process the response data and return structured information"""
         raise NotImplementedError
 
-class VirtualCardTransactionHandler(ResponseHandler):
-    """Handler for virtual card transaction responses"""
-    def process(self, response_data: Dict[str, Any]) -> List[Transaction]:
-        transactions = []
-        try:
-            for tx in response_data.get("cardsTransactions", []):
-                try:
-                    # Get category name or use default if missing
-                    category = "Uncategorized"
-                    if "humanCategory" in tx and tx["humanCategory"] is not None:
-                        category = tx["humanCategory"].get("name", "Uncategorized")
-                    
-                    # Get shop name or default value
-                    description = "Unknown transaction"
-                    if "shop" in tx and tx["shop"] is not None:
-                        description = tx["shop"].get("name", "Unknown shop").title()
-                    
-                    # Parse transactionDate with full time precision
-                    # Example format: "2025-03-11T00:00:00.000+0100"
-                    if "transactionDate" not in tx or not tx["transactionDate"]:
-                        logger.warning(f"Missing transactionDate in transaction: {tx}")
-                        continue  # Skip transactions without a date
-                    
-                    # Replace Z with +00:00 if present, otherwise keep the timezone info
-                    date_str = tx["transactionDate"]
-                    if date_str.endswith('Z'):
-                        date_str = date_str[:-1] + '+00:00'
-                    
-                    # Handle different timezone formats
-                    if '+' in date_str and len(date_str.split('+')[1]) == 4:
-                        # Convert +0100 format to +01:00 format
-                        timezone_part = date_str.split('+')[1]
-                        hours = timezone_part[:2]
-                        minutes = timezone_part[2:]
-                        date_str = date_str.split('+')[0] + '+' + hours + ':' + minutes
-                    
-                    transaction_date = datetime.fromisoformat(date_str)
-                    
-                    # Get amount safely
-                    amount = 0.0
-                    if "amount" in tx and tx["amount"] is not None:
-                        amount = float(tx["amount"].get("amount", 0.0))
-                    
-                    transaction = Transaction(
-                        date=transaction_date,
-                        description=description,
-                        category=category,
-                        amount=amount,
-                        source="virtual_card"
-                    )
-                    transactions.append(transaction)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to process virtual card transaction: {str(e)}")
-                    logger.debug(f"Problematic transaction data: {tx}")
-                    continue
-        except Exception as e:
-            logger.error(f"Error processing virtual card transactions: {str(e)}")
-        return transactions
+class TransactionListHandler(ResponseHandler):
+    """Base class for responses holding a list of transactions
+    
+    Subclasses set the list and date keys of their payload and build each
+    Transaction; the loop, date parsing and error handling are shared.
+    """
+    list_key = ""
+    date_key = ""
+    label = ""
+
+    def skip(self, tx: Dict[str, Any]) -> bool:
+        """Return True for list entries that are not transactions"""
+        return False
+
+    def build(self, tx: Dict[str, Any], transaction_date: datetime) -> Transaction:
+        """Build a Transaction from a single list entry"""
+        raise NotImplementedError
+
+    @staticmethod
+    def get_category(tx: Dict[str, Any]) -> str:
+        """Get category name or use default if missing"""
+        human_category = tx.get("humanCategory")
+        if human_category is not None:
+            return human_category.get("name", "Uncategorized")
+        return "Uncategorized"
+
+    @staticmethod
+    def get_amount(tx: Dict[str, Any]) -> float:
+        """Get amount safely"""
+        amount_obj = tx.get("amount")
+        if amount_obj is not None:
+            return float(amount_obj.get("amount", 0.0))
+        return 0.0
 
-class BankAccountTransactionHandler(ResponseHandler):
-    """Handler for bank account transaction responses"""
     def process(self, response_data: Dict[str, Any]) -> List[Transaction]:
         transactions = []
         try:
-            for tx in response_data.get("accountTransactions", []):
+            for tx in response_data.get(self.list_key, ()):
                 try:
-                    # Check if this is an account balance entry rather than a transaction
-                    # Account balance entries have 'contract' and 'account' but no transaction data
-                    if "contract" in tx and "account" in tx and "valueDate" not in tx:
-                        # This is an account balance entry, not a transaction - silently skip
+                    if self.skip(tx):
                         continue
                     
-                    # Parse valueDate with full time precision
+                    # Parse the date with full time precision
                     # Example format: "2025-03-11T00:00:00.000+0100"
-                    if "valueDate" not in tx or not tx["valueDate"]:
-                        logger.warning(f"Missing valueDate in what appears to be a transaction: {tx}")
+                    date_str = tx.get(self.date_key)
+                    if not date_str:
+                        logger.warning(f"Missing {self.date_key} in transaction: {tx}")
                         continue  # Skip transactions without a date
                     
-                    # Replace Z with +00:00 if present, otherwise keep the timezone info
-                    date_str = tx["valueDate"]
-                    if date_str.endswith('Z'):
-                        date_str = date_str[:-1] + '+00:00'
-                    
-                    # Handle different timezone formats
-                    if '+' in date_str and len(date_str.split('+')[1]) == 4:
-                        # Convert +0100 format to +01:00 format
-                        timezone_part = date_str.split('+')[1]
-                        hours = timezone_part[:2]
-                        minutes = timezone_part[2:]
-                        date_str = date_str.split('+')[0] + '+' + hours + ':' + minutes
+                    transactions.append(self.build(tx, parse_bbva_datetime(date_str)))
                     
-                    transaction_date = datetime.fromisoformat(date_str)
-                    
-                    # Get description safely
-                    description = tx.get("humanConceptName", "").strip()
-                    if not description:
-                        description = "Unknown transaction"
-                    
-                    # Get category name or use default if missing
-                    category = "Uncategorized"
-                    if "humanCategory" in tx and tx["humanCategory"] is not None:
-                        category = tx["humanCategory"].get("name", "Uncategorized")
-                    
-                    # Get amount safely
-                    amount = 0.0
-                    if "amount" in tx and tx["amount"] is not None:
-                        amount = float(tx["amount"].get("amount", 0.0))
-                    
-                    # Get balance safely
-                    balance = 0.0
-                    if "balance" in tx and tx["balance"] is not None:
-                        balance_obj = tx["balance"].get("accountingBalance", {})
-                        if balance_obj and "amount" in balance_obj:
-                            balance = float(balance_obj.get("amount", 0.0))
-                    
-                    # Get more info safely
-                    more_info = tx.get("humanExtendedConceptName", "").strip()
-                    
-                    transaction = Transaction(
-                        date=transaction_date,
-                        description=description,
-                        category=category,
-                        amount=amount,
-                        source="bank_account",
-                        balance=balance,
-                        more_info=more_info
-                    )
-                    transactions.append(transaction)
                 except Exception as e:
-                    logger.warning(f"Failed to process bank account transaction: {e}")
-                    logger.debug(f"Problematic transaction data: {tx}")
+                    logger.warning(f"Failed to process {self.label} transaction: {str(e)}")
+                    logger.debug("Problematic transaction data: %s", tx)
                     continue
         except Exception as e:
-            logger.error(f"Error processing bank account transactions: {e}")
+            logger.error(f"Error processing {self.label} transactions: {str(e)}")
         return transactions
 
+class VirtualCardTransactionHandler(TransactionListHandler):
+    """Handler for virtual card transaction responses"""
+    list_key = "cardsTransactions"
+    date_key = "transactionDate"
+    label = "virtual card"
+
+    def build(self, tx: Dict[str, Any], transaction_date: datetime) -> Transaction:
+        # Get shop name or default value
+        description = "Unknown transaction"
+        shop = tx.get("shop")
+        if shop is not None:
+            description = title_case(shop.get("name", "Unknown shop"))
+        
+        return Transaction(
+            date=transaction_date,
+            description=description,
+            category=self.get_category(tx),
+            amount=self.get_amount(tx),
+            source="virtual_card"
+        )
+
+class BankAccountTransactionHandler(TransactionListHandler):
+    """Handler for bank account transaction responses"""
+    list_key = "accountTransactions"
+    date_key = "valueDate"
+    label = "bank account"
+
+    def skip(self, tx: Dict[str, Any]) -> bool:
+        # Account balance entries have 'contract' and 'account' but no transaction data
+        return "contract" in tx and "account" in tx and "valueDate" not in tx
+
+    @staticmethod
+    def get_balance(tx: Dict[str, Any]) -> float:
+        """Get accounting balance safely"""
+        balance_info = tx.get("balance")
+        if balance_info is not None:
+            amount = (balance_info.get("accountingBalance") or {}).get("amount")
+            if amount is not None:
+                return float(amount)
+        return 0.0
+
+    def build(self, tx: Dict[str, Any], transaction_date: datetime) -> Transaction:
+        # Get description safely
+        description = tx.get("humanConceptName", "").strip()
+        if not description:
+            description = "Unknown transaction"
+        
+        return Transaction(
+            date=transaction_date,
+            description=description,
+            category=self.get_category(tx),
+            amount=self.get_amount(tx),
+            source="bank_account",
+            balance=self.get_balance(tx),
+            more_info=tx.get("humanExtendedConceptName", "").strip()
+        )
+
 class FinancialOverviewHandler(ResponseHandler):
     """Handler for financial overview responses"""
+    def __init__(self):
+        super().__init__()
+        # Builders by contract productType; other product types are ignored
+        self.builders = {
+            "ACCOUNT": self.add_account,
+            "CARD": self.add_card
+        }
+
+    @staticmethod
+    def get_product_name(contract: Dict[str, Any]) -> str:
+        """Get the product name of a contract or an empty string if missing"""
+        try:
+            return contract["product"]["name"]
+        except (KeyError, TypeError):
+            return ""
+
+    @staticmethod
+    def get_specific_amount(contract: Dict[str, Any], index: int) -> float:
+        """Get the first amount of the contract's specific amount at index, or 0 if missing"""
+        try:
+            return float(contract["detail"]["specificAmounts"][index]["amounts"][0]["amount"])
+        except (KeyError, IndexError, TypeError):
+            return 0.0
+
+    def add_account(self, contract: Dict[str, Any], result: Dict[str, List[Any]]):
+        result["accounts"].append(AccountBalance(
+            account_number=contract.get("number", ""),
+            account_type=self.get_product_name(contract),
+            available_balance=self.get_specific_amount(contract, 0),
+            current_balance=self.get_specific_amount(contract, 1)
+        ))
+
+    def add_card(self, contract: Dict[str, Any], result: Dict[str, List[Any]]):
+        product_name = self.get_product_name(contract)
+        if product_name not in VIRTUAL_CARD_PRODUCTS:
+            return
+        
+        try:
+            status = contract["detail"]["status"]["id"]
+        except (KeyError, TypeError):
+            status = ""
+        
+        result["cards"].append(CardInfo(
+            card_number=contract.get("number", ""),
+            alias=contract.get("alias", ""),
+            type=product_name,
+            status=status,
+            available_balance=self.get_specific_amount(contract, 0)
+        ))
+
     def process(self, response_data: Dict[str, Any]) -> Dict[str, List[Any]]:
         result = {
             "accounts": [],
             "cards": []
         }
         try:
-            for contract in response_data.get("data", {}).get("contracts", []):               
-                if contract.get("productType") == "ACCOUNT":
-                    try:
-                        account = AccountBalance(
-                            account_number=contract.get("number", ""),
-                            account_type=contract.get("product", {}).get("name", ""),
-                            available_balance=float(contract.get("detail", {}).get("specificAmounts", [{}])[0].get("amounts", [{}])[0].get("amount", 0)),
-                            current_balance=float(contract.get("detail", {}).get("specificAmounts", [{}])[1].get("amounts", [{}])[0].get("amount", 0))
-                        )
-                        result["accounts"].append(account)
-                    except Exception as e:
-                        logger.warning(f"Failed to process account: {str(e)}")
-                        continue
-
-                # Process cards
-                elif contract.get("productType") == "CARD" and contract.get("product", {}).get("name", "") == "TARJETAS VIRTUALES":
-                    try:
-                        card = CardInfo(
-                            card_number=contract.get("number", ""),
-                            alias=contract.get("alias", ""),
-                            type=contract.get("product", {}).get("name", ""),
-                            status=contract.get("detail", {}).get("status", {}).get("id", ""),
-                            available_balance=float(contract.get("detail", {}).get("specificAmounts", [{}])[0].get("amounts", [{}])[0].get("amount", 0))
-                        )
-                        result["cards"].append(card)
-                    except Exception as e:
-                        logger.warning(f"Failed to process card: {str(e)}")
-                        continue
+            for contract in response_data["data"]["contracts"]:
+                product_type = contract.get("productType")
+                builder = self.builders.get(product_type)
+                if builder is None:
+                    continue
+                
+                try:
+                    builder(contract, result)
+                except Exception as e:
+                    logger.warning(f"Failed to process {product_type.lower()}: {str(e)}")
+                    continue
 
+        except (KeyError, TypeError):
+            logger.warning("Financial overview response has no contracts")
         except Exception as e:
             logger.error(f"Error processing financial overview: {str(e)}")
         
@@ -249,11 +427,16 @@ class BBVAScraperImproved:
         self.base_url = str(os.getenv("BBVA_BASE_URL"))
         self.username = str(os.getenv("BBVA_USERNAME"))
         self.password = str(os.getenv("BBVA_PASSWORD"))
+        # Reusing the login cookies between runs is opt-in: the saved file grants access to the account
+        self.save_session = os.getenv("BBVA_SAVE_SESSION", "false").strip().lower() == "true"
         self.driver = None
+        self.wait = None
         self.debugger_address = debugger_address
         self.ws = None
         self.ws_ready = Event()
         self.network_enabled = False
+        # Keep-alive HTTP session for the DevTools endpoints
+        self._http = requests.Session()
         
         # Initialize response handlers
         self.response_handlers = {
@@ -269,83 +452,125 @@ class BBVAScraperImproved:
             "accounts": [],
             "cards": []
         }
+        
+        # Response bodies are parsed on a small pool; results are swapped in under the lock
+        self._body_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bbva_body")
+        self._data_lock = Lock()
+        
+        # getResponseBody requests get their own ids so concurrent replies reach the right handler;
+        # each pending entry holds the handler kind and the paused Fetch request id
+        self._next_message_id = itertools.count(1000)
+        self._pending_bodies: Dict[int, tuple] = {}
+        
+        # Set once a response of each kind has been handled, so callers can wait for the data itself
+        self._captured = {kind: Event() for kind in RESPONSE_KINDS}
+
+    def _send_command(self, ws, method: str, params: Dict[str, Any]) -> int:
+        """Send a CDP command with a fresh id and return the id"""
+        rid = next(self._next_message_id)
+        ws.send(json_dumps({"id": rid, "method": method, "params": params}))
+        return rid
+
+    def _request_response_body(self, ws, kind: str, request_id: str):
+        """Ask Chrome for a paused response's body, remembering which handler its reply belongs to"""
+        rid = next(self._next_message_id)
+        self._pending_bodies[rid] = (kind, request_id)
+        ws.send(json_dumps({
+            "id": rid,
+            "method": "Fetch.getResponseBody",
+            "params": {"requestId": request_id}
+        }))
+
+    def _handle_response_body(self, kind: str, result: Dict[str, Any]):
+        """Parse a Fetch.getResponseBody result and store the processed data"""
+        try:
+            body = result["body"]
+            # Chrome base64-encodes bodies it does not treat as text; decode to bytes and parse those directly
+            if result.get("base64Encoded"):
+                body = base64.b64decode(body)
+            response_data = json_loads(body)
+            # Pretty-printing a whole payload is expensive; only do it when debug logging is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received response data: %s", json.dumps(response_data, indent=2))
+            
+            processed = self.response_handlers[kind].process(response_data)
+            with self._data_lock:
+                if kind == "listIntegratedCardTransactions":
+                    self.virtual_card_transactions = processed
+                elif kind == "accountTransactions":
+                    self.bank_account_transactions = processed
+                else:
+                    self.financial_overview = processed
+            
+            if kind == "financial-overview":
+                logger.info(f"Processed financial overview with {len(processed['accounts'])} accounts and {len(processed['cards'])} cards")
+            else:
+                logger.info(f"Processed {len(processed)} {self.response_handlers[kind].label} transactions")
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse response data: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error handling response body: {str(e)}")
+        finally:
+            # Release waiters on failure too; they find the previous data instead of hanging until timeout
+            self._captured[kind].set()
+
+    def wait_for_capture(self, kind: str, timeout: float = 15) -> bool:
+        """Block until a response of the given kind (a RESPONSE_KINDS entry) has been handled
+        
+        Returns False on timeout. The click helpers reset the event before the click that
+        triggers the request, so this waits for that response rather than an earlier one.
+        """
+        return self._captured[kind].wait(timeout)
 
     def _on_ws_message(self, ws, message):
         """Handle WebSocket messages"""
         try:
-            msg = json.loads(message)
+            # Drop frames that are neither command replies (they carry an "id") nor paused requests before
+            # parsing them; with only the Fetch domain enabled there are few, but other domains may still emit
+            if '"id":' not in message and "Fetch.requestPaused" not in message:
+                return
+            
+            msg = json_loads(message)
             
-            # Check if Network.enable was successful
+            # Check if Fetch.enable was successful
             if msg.get("id") == 1 and "error" not in msg:
                 self.network_enabled = True
                 self.ws_ready.set()
                 logger.info("WebSocket network monitoring ready")
                 return
             
-            # Handle response body
-            if msg.get("id") == 999 and "result" in msg:
-                try:
-                    response_data = json.loads(msg["result"]["body"])
-                    logger.debug(f"Received response data: {json.dumps(response_data, indent=2)}")
-                    
-                    # Determine response type and process accordingly
-                    if "cardsTransactions" in response_data:
-                        handler = self.response_handlers["listIntegratedCardTransactions"]
-                        self.virtual_card_transactions = handler.process(response_data)
-                        logger.info(f"Processed {len(self.virtual_card_transactions)} virtual card transactions")
-                    
-                    elif "accountTransactions" in response_data:
-                        handler = self.response_handlers["accountTransactions"]
-                        self.bank_account_transactions = handler.process(response_data)
-                        logger.info(f"Processed {len(self.bank_account_transactions)} bank account transactions")
-                    
-                    elif "data" in response_data and "contracts" in response_data["data"]:
-                        handler = self.response_handlers["financial-overview"]
-                        self.financial_overview = handler.process(response_data)
-                        logger.info(f"Processed financial overview with {len(self.financial_overview['accounts'])} accounts and {len(self.financial_overview['cards'])} cards")
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse response data: {str(e)}")
-
-            # Handle responses
-            elif msg.get("method") == "Network.responseReceived":
-                response = msg["params"]["response"]
-                url = response.get("url", "")
-                logger.debug(f"Received response for URL: {url}")
-                
-                # Check for different types of responses
-                if "listIntegratedCardTransactions" in url:
-                    logger.info("Detected virtual card transactions response")
-                    request_id = msg["params"]["requestId"]
-                    ws.send(json.dumps({
-                        "id": 999,
-                        "method": "Network.getResponseBody",
-                        "params": {"requestId": request_id}
-                    }))
-                elif "accountTransactions" in url:
-                    logger.info("Detected bank account transactions response")
-                    request_id = msg["params"]["requestId"]
-                    ws.send(json.dumps({
-                        "id": 999,
-                        "method": "Network.getResponseBody",
-                        "params": {"requestId": request_id}
-                    }))
-                elif "financial-overview" in url:
-                    logger.info("Detected financial overview response")
-                    request_id = msg["params"]["requestId"]
-                    ws.send(json.dumps({
-                        "id": 999,
-                        "method": "Network.getResponseBody",
-                        "params": {"requestId": request_id}
-                    }))
+            # Handle response body, routed by the id of the getResponseBody request
+            pending = self._pending_bodies.pop(msg.get("id"), None)
+            if pending is not None:
+                kind, request_id = pending
+                if "result" in msg:
+                    # Parse off the WebSocket thread so it can keep pumping frames
+                    self._body_pool.submit(self._handle_response_body, kind, msg["result"])
                 else:
-                    logger.debug(f"Received response for URL: {url}")
+                    logger.error(f"Failed to get {kind} response body: {msg.get('error')}")
+                # The body is in hand, let the page have its response
+                self._send_command(ws, "Fetch.continueRequest", {"requestId": request_id})
 
-            # Handle request will be sent
-            elif msg.get("method") == "Network.requestWillBeSent":
-                request = msg["params"]["request"]
-                url = request.get("url", "")
-                logger.debug(f"Request will be sent to: {url}")
+            # Handle paused requests; every one must be continued or failed, or the page hangs on it
+            elif msg.get("method") == "Fetch.requestPaused":
+                params = msg["params"]
+                request_id = params["requestId"]
+                
+                # Paused before being sent: a blocked resource type
+                if "responseStatusCode" not in params and "responseErrorReason" not in params:
+                    self._send_command(ws, "Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"})
+                    return
+                
+                # Paused with its response: capture the body of API calls, skipping CORS preflights and failures
+                request = params["request"]
+                match = RESPONSE_URL_RE.search(request["url"])
+                if match and "responseStatusCode" in params and request.get("method") != "OPTIONS":
+                    kind = match.group(1)
+                    logger.info(f"Detected {kind} response")
+                    self._request_response_body(ws, kind, request_id)
+                else:
+                    self._send_command(ws, "Fetch.continueRequest", {"requestId": request_id})
 
         except Exception as e:
             logger.error(f"Error in WebSocket message handler: {str(e)}")
@@ -354,9 +579,11 @@ class BBVAScraperImproved:
     def _on_ws_open(self, ws):
         """Handle WebSocket connection open"""
         logger.info("WebSocket connected, enabling network monitoring...")
-        ws.send(json.dumps({"id": 1, "method": "Network.enable"}))
+        # Intercept only the API responses we capture and the resource types we block, instead of
+        # receiving a Network event for every request the page makes
+        ws.send(json_dumps({"id": 1, "method": "Fetch.enable", "params": {"patterns": FETCH_PATTERNS}}))
         # Also enable request interception
-        ws.send(json.dumps({"id": 2, "method": "Network.setBypassServiceWorker", "params": {"bypass": True}}))
+        ws.send(json_dumps({"id": 2, "method": "Network.setBypassServiceWorker", "params": {"bypass": True}}))
 
     def setup_driver(self):
         """Initialize the WebDriver and WebSocket connection"""
@@ -373,8 +600,15 @@ class BBVAScraperImproved:
             edge_options = EdgeOptions()
             edge_options.add_argument("--start-maximized")
             edge_options.use_chromium = True
+            # A persistent profile keeps the HTTP cache (and the remembered login) between runs
+            profile_dir = os.getenv("BROWSER_PROFILE_DIR")
+            if profile_dir:
+                edge_options.add_argument(f"--user-data-dir={profile_dir}")
             self.driver = webdriver.Edge(options=edge_options)
         
+        # Shared wait for the click helpers, built once per driver
+        self.wait = WebDriverWait(self.driver, 10)
+        
         # Crear nueva pestaña y navegar al portal (igual que Caixa)
         logger.info("Creating new tab")
         self.driver.switch_to.new_window('tab')
@@ -386,14 +620,10 @@ class BBVAScraperImproved:
         # Initialize WebSocket connection
         try:
             debugger_url = f"http://{self.debugger_address}/json" if self.debugger_address else "http://localhost:59222/json"
-            targets = requests.get(debugger_url).json()
+            targets = json_loads(self._http.get(debugger_url, timeout=5).content)
             
             # Find the page/tab that matches our current window handle
-            target_page = None
-            for target in targets:
-                if target.get("id") == current_handle:
-                    target_page = target
-                    break
+            target_page = next((target for target in targets if target.get("id") == current_handle), None)
             
             if not target_page:
                 logger.error(f"Could not find WebSocket debugger URL for tab handle: {current_handle}")
@@ -409,8 +639,7 @@ class BBVAScraperImproved:
             )
             
             # Start WebSocket in a separate thread
-            import threading
-            ws_thread = threading.Thread(target=self.ws.run_forever)
+            ws_thread = Thread(target=self.ws.run_forever)
             ws_thread.daemon = True
             ws_thread.start()
             
@@ -422,9 +651,8 @@ class BBVAScraperImproved:
             logger.error(f"Failed to initialize WebSocket: {str(e)}")
             raise  # Re-raise the exception to handle it in the calling code
         
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
+        with self._implicit_wait(10):
+            self.driver.find_element(By.TAG_NAME, "body")
         logger.info("WebDriver and WebSocket setup completed")
 
     def get_virtual_card_transactions(self) -> List[Transaction]:
@@ -441,17 +669,20 @@ class BBVAScraperImproved:
 
     def clear_data(self):
         """Clear all captured data"""
-        self.virtual_card_transactions = []
-        self.bank_account_transactions = []
-        self.financial_overview = {
-            "accounts": [],
-            "cards": []
-        }
+        with self._data_lock:
+            self.virtual_card_transactions = []
+            self.bank_account_transactions = []
+            self.financial_overview = {
+                "accounts": [],
+                "cards": []
+            }
 
     def close(self):
         """Close the browser session and WebSocket connection"""
         if self.ws:
             self.ws.close()
+        self._body_pool.shutdown(wait=True)
+        self._http.close()
         if self.driver:
             self.driver.quit()
 
@@ -461,48 +692,53 @@ class BBVAScraperImproved:
             logger.info("Starting CSV export process")
             
             # Create data/exports directory if it doesn't exist
-            os.makedirs("data/exports", exist_ok=True)
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            
+            # Filename prefix shared by every file of this export
+            prefix = os.path.join(EXPORT_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_bbva")
             
-            # Get current timestamp for filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Filter and sort transactions once (newest first); every file of the same kind gets the same rows
+            account_transactions = sorted(
+                (tx for tx in self.bank_account_transactions if tx.source == "bank_account"),
+                key=attrgetter("date"),
+                reverse=True
+            )
+            card_transactions = sorted(
+                (tx for tx in self.virtual_card_transactions if tx.source == "virtual_card"),
+                key=attrgetter("date"),
+                reverse=True
+            )
+            
+            # Build the CSV frames once per kind, so dates are formatted once instead of once per file.
+            # Dates are formatted up front: offsets change with DST, so pandas would keep them as objects
+            account_frame = pd.DataFrame(
+                [
+                    (tx.date.strftime(EXPORT_DATE_FORMAT), tx.description, tx.more_info, tx.category, tx.amount, tx.balance)
+                    for tx in account_transactions
+                ],
+                columns=['date', 'description', 'more_info', 'category', 'amount', 'balance']
+            )
+            card_frame = pd.DataFrame(
+                [
+                    (tx.date.strftime(EXPORT_DATE_FORMAT), tx.description, tx.category, tx.amount)
+                    for tx in card_transactions
+                ],
+                columns=['date', 'description', 'category', 'amount']
+            )
             
             # Process each account's transactions
             for account in self.financial_overview["accounts"]:
                 try:
-                    # Create filename
-                    account_name = "cuentas_personales"  # Default name
-                    if "pau" in account.account_type.lower():
-                        account_name = "pau"
-                    
-                    filename = f"{timestamp}_bbva_{account_name}_{account.account_number}.csv"
-                    filepath = os.path.join("data/exports", filename)
-                    
-                    # Filter transactions for this account
-                    account_transactions = [
-                        tx for tx in self.bank_account_transactions
-                        if tx.source == "bank_account"
-                    ]
+                    # Create filename; accounts default to cuentas_personales
+                    account_type = account.account_type.lower()
+                    account_name = "pau" if "pau" in account_type else "cuentas_personales"
                     
-                    # Sort transactions by date (newest first)
-                    account_transactions.sort(key=lambda x: x.date, reverse=True)
+                    filepath = f"{prefix}_{account_name}_{account.account_number}.csv"
                     
                     # Write to CSV
-                    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                        import csv
-                        writer = csv.writer(f)
-                        writer.writerow(['date', 'description', 'more_info', 'category', 'amount', 'balance'])
-                        
-                        for tx in account_transactions:
-                            writer.writerow([
-                                tx.date.strftime("%Y-%m-%d %H:%M:%S"),
-                                tx.description,
-                                tx.more_info,
-                                tx.category,
-                                tx.amount,
-                                tx.balance
-                            ])
+                    account_frame.to_csv(filepath, index=False, encoding='utf-8', lineterminator='\n')
                     
-                    logger.info(f"Successfully exported transactions to {filename}")
+                    logger.info(f"Successfully exported transactions to {os.path.basename(filepath)}")
                     
                 except Exception as e:
                     logger.error(f"Failed to export transactions for account {account.account_number}: {str(e)}")
@@ -512,33 +748,12 @@ class BBVAScraperImproved:
             for card in self.financial_overview["cards"]:
                 try:
                     # Create filename for virtual card
-                    filename = f"{timestamp}_bbva_virtual_card_{card.card_number}.csv"
-                    filepath = os.path.join("data/exports", filename)
-                    
-                    # Filter transactions for this virtual card
-                    card_transactions = [
-                        tx for tx in self.virtual_card_transactions
-                        if tx.source == "virtual_card"
-                    ]
-                    
-                    # Sort transactions by date (newest first)
-                    card_transactions.sort(key=lambda x: x.date, reverse=True)
+                    filepath = f"{prefix}_virtual_card_{card.card_number}.csv"
                     
                     # Write to CSV
-                    with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                        import csv
-                        writer = csv.writer(f)
-                        writer.writerow(['date', 'description', 'category', 'amount'])
-                        
-                        for tx in card_transactions:
-                            writer.writerow([
-                                tx.date.strftime("%Y-%m-%d %H:%M:%S"),
-                                tx.description,
-                                tx.category,
-                                tx.amount
-                            ])
+                    card_frame.to_csv(filepath, index=False, encoding='utf-8', lineterminator='\n')
                     
-                    logger.info(f"Successfully exported virtual card transactions to {filename}")
+                    logger.info(f"Successfully exported virtual card transactions to {os.path.basename(filepath)}")
                     
                 except Exception as e:
                     logger.error(f"Failed to export transactions for virtual card {card.card_number}: {str(e)}")
@@ -561,13 +776,12 @@ class BBVAScraperImproved:
         """Navigate to accounts and cards overview page"""
         try:
             logger.info("Navigating to accounts overview page")
-            self.driver.get("https://web.bbva.es/index.html#subhome-cuentas-tarjetas")
+            self.driver.get(f"{DASHBOARD_URL}#subhome-cuentas-tarjetas")
             
             # Wait for the accounts section to load
             logger.info("Waiting for accounts section to load")
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "cuentasTarjetasProductos"))
-            )
+            with self._implicit_wait(10):
+                self.driver.find_element(*ACCOUNTS_OVERVIEW)
             
             logger.info("Successfully loaded accounts overview page")
             return True
@@ -581,34 +795,29 @@ class BBVAScraperImproved:
         try:
             logger.info("Waiting for first account row to be clickable")
             # Find the first account row
-            account_row = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "tr.filaCuentasIban"))
+            account_row = self.wait.until(
+                EC.element_to_be_clickable(ACCOUNT_ROW)
             )
             
             logger.info("Found account row, attempting to click")
+            self._captured["accountTransactions"].clear()
             # Try multiple click methods
             try:
-                # Scroll into view first
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", account_row)
-                time.sleep(0.5)
-                
-                # Try JavaScript click
-                self.driver.execute_script("arguments[0].click();", account_row)
-            except Exception as e:
+                # Scroll into view and click via JavaScript in one call
+                self.driver.execute_script(SCROLL_AND_CLICK_JS, account_row)
+            except CLICK_FALLBACK_EXCEPTIONS as e:
                 logger.warning(f"JavaScript click failed: {str(e)}, trying regular click")
                 try:
                     account_row.click()
-                except Exception as e:
+                except CLICK_FALLBACK_EXCEPTIONS as e:
                     logger.warning(f"Regular click failed: {str(e)}, trying action chains")
-                    from selenium.webdriver.common.action_chains import ActionChains
                     actions = ActionChains(self.driver)
                     actions.move_to_element(account_row).click().perform()
             
             # Wait for the transactions page to load
             logger.info("Waiting for transactions page to load")
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "c-tablas-producto"))
-            )
+            with self._implicit_wait(10):
+                self.driver.find_element(*ACCOUNT_TRANSACTIONS)
             
             logger.info("Successfully clicked account row")
             return True
@@ -622,34 +831,29 @@ class BBVAScraperImproved:
         try:
             logger.info("Waiting for virtual card row to be clickable")
             # Find the virtual card row by looking for the text "TARJETAS VIRTUALES"
-            virtual_card_row = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//span[contains(@class, 'nombreComercial') and contains(text(), 'TARJETAS VIRTUALES')]/ancestor::tr"))
+            virtual_card_row = self.wait.until(
+                EC.element_to_be_clickable(VIRTUAL_CARD_ROW)
             )
             
             logger.info("Found virtual card row, attempting to click")
+            self._captured["listIntegratedCardTransactions"].clear()
             # Try multiple click methods
             try:
-                # Scroll into view first
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", virtual_card_row)
-                time.sleep(0.5)
-                
-                # Try JavaScript click
-                self.driver.execute_script("arguments[0].click();", virtual_card_row)
-            except Exception as e:
+                # Scroll into view and click via JavaScript in one call
+                self.driver.execute_script(SCROLL_AND_CLICK_JS, virtual_card_row)
+            except CLICK_FALLBACK_EXCEPTIONS as e:
                 logger.warning(f"JavaScript click failed: {str(e)}, trying regular click")
                 try:
                     virtual_card_row.click()
-                except Exception as e:
+                except CLICK_FALLBACK_EXCEPTIONS as e:
                     logger.warning(f"Regular click failed: {str(e)}, trying action chains")
-                    from selenium.webdriver.common.action_chains import ActionChains
                     actions = ActionChains(self.driver)
                     actions.move_to_element(virtual_card_row).click().perform()
             
             # Wait for the transactions page to load
             logger.info("Waiting for transactions page to load")
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='cards-main-transactions']"))
-            )
+            with self._implicit_wait(10):
+                self.driver.find_element(*CARD_TRANSACTIONS)
             
             logger.info("Successfully clicked virtual card row")
             return True
@@ -658,119 +862,245 @@ class BBVAScraperImproved:
             logger.error(f"Failed to click virtual card row: {str(e)}")
             return False
 
+    def _wait_for_any_locator(self, locators: List[tuple], timeout: float) -> int:
+        """Wait until one of the locators is present; return its index or -1 on timeout
+        
+        Polls through WebDriver, so unlike _wait_for_any it keeps waiting across page navigations.
+        """
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.any_of(*(EC.presence_of_element_located(locator) for locator in locators))
+            )
+        except TimeoutException:
+            return -1
+        for index, locator in enumerate(locators):
+            if self.driver.find_elements(*locator):
+                return index
+        return -1
+
+    def _wait_for_any(self, selectors: List[str], timeout: float) -> int:
+        """Wait until one of the CSS selectors matches; return its index or -1 on timeout
+        
+        Only for waits that cannot cross a navigation (an unload aborts the script); use
+        _wait_for_any_locator for anything that follows a click or a page load.
+        """
+        return self.driver.execute_async_script(WAIT_FOR_ANY_JS, selectors, int(timeout * 1000))
+
+    @contextmanager
+    def _implicit_wait(self, seconds: float):
+        """Let find_element wait up to seconds for presence, polling inside the driver
+        
+        Replaces presence-only WebDriverWait loops, which poll over HTTP from here. The implicit
+        wait is reset to 0 on exit so find_elements probes and explicit waits stay non-blocking.
+        """
+        self.driver.implicitly_wait(seconds)
+        try:
+            yield
+        finally:
+            self.driver.implicitly_wait(0)
+
+    def _cdp_click(self, selector: str) -> bool:
+        """Scroll to and click the element matching a CSS selector with a single CDP Runtime.evaluate
+        
+        Skips the WebDriver script endpoint and its element serialization. Returns False when
+        the driver has no CDP access or nothing matches, so the caller can click through WebDriver.
+        """
+        if not hasattr(self.driver, "execute_cdp_cmd"):
+            return False
+        result = self.driver.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": CDP_CLICK_JS % json.dumps(selector),
+            "returnByValue": True
+        })
+        return bool(result.get("result", {}).get("value"))
+
+    def _insert_text(self, field, text: str):
+        """Type text into a field with a single CDP Input.insertText, or send_keys without CDP access"""
+        if not hasattr(self.driver, "execute_cdp_cmd"):
+            field.send_keys(text)
+            return
+        self.driver.execute_script("arguments[0].focus();", field)
+        self.driver.execute_cdp_cmd("Input.insertText", {"text": text})
+
+    def _type_credentials(self, username: Optional[str], password_field):
+        """Type the credentials field by field, the slow path when filling them via JavaScript fails"""
+        if username is not None:
+            logger.info("Looking for username field")
+            username_field = fast_wait(self.driver, 10).until(
+                EC.element_to_be_clickable(USERNAME_INPUT)
+            )
+            logger.info("Entering username")
+            username_field.clear()  # Clear any existing value
+            self._insert_text(username_field, username)
+
+        logger.info("Entering password")
+        password_field.clear()  # Clear any existing value
+        self._insert_text(password_field, self.password)
+
+        # Blur the password field so the form validates it; one script call instead of finding and clicking the body
+        self.driver.execute_script("arguments[0].blur();", password_field)
+
+    def _restore_session(self) -> bool:
+        """Load the cookies of a recent login and return True if the dashboard opens with them
+        
+        On any miss the tab is left on the login page, ready for the regular flow.
+        """
+        if not self.save_session or not hasattr(self.driver, "execute_cdp_cmd"):
+            return False
+        try:
+            if time.time() - os.path.getmtime(SESSION_COOKIES_PATH) > SESSION_MAX_AGE:
+                logger.info("Saved session is too old, logging in again")
+                return False
+            with open(SESSION_COOKIES_PATH, "rb") as f:
+                cookies = json_loads(f.read())
+        except (OSError, ValueError):
+            return False
+        
+        logger.info("Restoring saved session")
+        try:
+            # CDP can set cookies for every BBVA domain at once, unlike WebDriver's add_cookie
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            self.driver.get(DASHBOARD_URL)
+            # Expired cookies redirect to the login page, so the wait has to survive that navigation
+            if self._wait_for_any_locator([DASHBOARD, LOGIN_FORM_TOKEN, LOGIN_FORM], 10) == 0:
+                return True
+            
+            logger.info("Saved session has expired, logging in again")
+            self.driver.get(self.base_url)
+        except Exception as e:
+            logger.warning(f"Failed to restore saved session: {str(e)}")
+            try:
+                self.driver.get(self.base_url)
+            except Exception:
+                pass
+        return False
+
+    def _save_session(self):
+        """Save the session cookies so the next run can skip the login form"""
+        if not self.save_session or not hasattr(self.driver, "execute_cdp_cmd"):
+            return
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getCookies", {"urls": [self.base_url, DASHBOARD_URL]})
+            # Keep only the fields Network.setCookies accepts; session cookies have no expiry to restore
+            cookies = []
+            for cookie in result.get("cookies", []):
+                saved = {key: cookie[key] for key in SESSION_COOKIE_FIELDS if key in cookie}
+                if cookie.get("session"):
+                    saved.pop("expires", None)
+                cookies.append(saved)
+            os.makedirs(os.path.dirname(SESSION_COOKIES_PATH), exist_ok=True)
+            # These cookies grant access to the bank account: create the file owner-only from the
+            # start instead of narrowing its permissions after the cookies are already on disk
+            fd = os.open(SESSION_COOKIES_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                # os.open only applies the mode when it creates the file, so also tighten a
+                # file left over from an earlier run (fchmod does not exist on Windows)
+                if hasattr(os, "fchmod"):
+                    os.fchmod(f.fileno(), 0o600)
+                json.dump(cookies, f)
+        except Exception as e:
+            logger.warning(f"Failed to save session cookies: {str(e)}")
+
     def login(self) -> bool:
         """Login to BBVA banking portal (ya estamos en una pestaña con base_url desde setup_driver)"""
         try:
+            # The fastest login is the one we skip: reuse the session of a recent run if still valid
+            if self._restore_session():
+                logger.info("Login successful (restored previous session)")
+                return True
+            
             # Wait for either username field or password-only form
             logger.info("Checking login form type")
-            try:
-                # First try to find the stored form (cookie-based login)
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='login-form-token']"))
-                )
+            # Look for the stored form (cookie-based login) and the regular one at the same time. The
+            # login page is already loaded here, so the in-page observer cannot be cut by a navigation
+            form_type = self._wait_for_any([LOGIN_FORM_TOKEN[1], LOGIN_FORM[1]], 10)
+            if form_type == -1:
+                raise TimeoutException("Login form not found")
+            cookie_based_login = form_type == 0
+            if cookie_based_login:
                 logger.info("Cookie-based login form detected")
-                cookie_based_login = True
-            except TimeoutException:
-                # If not found, look for the regular login form
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-testid='login-form']"))
-                )
+            else:
                 logger.info("Regular login form detected")
-                cookie_based_login = False
-
-            if not cookie_based_login:
-                # Regular login flow - need both username and password
-                logger.info("Looking for username field")
-                username_field = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.ID, "input-user"))
-                )
-                logger.info("Entering username")
-                username_field.clear()  # Clear any existing value
-                username_field.send_keys(self.username)
-                time.sleep(1)  # Small delay after username
 
-            # Password field is needed in both cases
+            # Password field is needed in both cases; the username only in the regular login flow
             logger.info("Looking for password field")
-            password_field = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "input-password"))
+            password_field = fast_wait(self.driver, 10).until(
+                EC.element_to_be_clickable(PASSWORD_INPUT)
             )
-            logger.info("Entering password")
-            password_field.clear()  # Clear any existing value
-            password_field.send_keys(self.password)
-            time.sleep(1)  # Small delay after password
-
-            # Click outside the password field to trigger blur event
-            logger.info("Clicking outside password field")
-            body = self.driver.find_element(By.TAG_NAME, "body")
-            body.click()
-            time.sleep(1)  # Wait for blur event to process
-
-            # Find and wait for login button to be clickable
-            logger.info("Waiting for login button to be clickable")
-            # Try to find button by data-testid first
+            username = None if cookie_based_login else self.username
             try:
-                login_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, "span[data-testid='login-form-submit']"))
-                )
-            except TimeoutException:
-                # If that fails, try finding by class and text content
-                login_button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable(
-                        (By.XPATH, "//span[contains(@class, 'c-button--secondary') and .//span[contains(text(), 'Entrar')]]")
-                    )
+                # Fill and blur the fields in a single script instead of one WebDriver call per action
+                logger.info("Entering credentials")
+                self.driver.execute_script(FILL_CREDENTIALS_JS, username, self.password)
+            except Exception as e:
+                logger.warning(f"Filling credentials via JavaScript failed: {str(e)}, typing them instead")
+                self._type_credentials(username, password_field)
+
+            # Find and wait for login button to be clickable; the form enables it once the blur is processed
+            logger.info("Waiting for login button to be clickable")
+            # Find the button by data-testid, or by class and text content if the form has none. The form is
+            # already rendered, so a non-raising find_elements probe decides without waiting out a timeout
+            login_buttons = self.driver.find_elements(*LOGIN_SUBMIT)
+            if login_buttons:
+                login_button = login_buttons[0]
+                login_selector = LOGIN_SUBMIT[1]
+            else:
+                login_button = fast_wait(self.driver, 10).until(
+                    lambda driver: driver.execute_script(FIND_BY_TEXT_JS, LOGIN_SUBMIT_BY_CLASS, "Entrar")
                 )
+                login_selector = None
+            login_button = fast_wait(self.driver, 10).until(
+                EC.element_to_be_clickable(login_button)
+            )
             
             logger.info("Found Entrar button, attempting to click")
-            time.sleep(1)  # Small delay before clicking
             
             # Try multiple click methods
             try:
-                # Try moving to element first
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", login_button)
-                time.sleep(0.5)
-                
-                # Try JavaScript click first
+                # Try JavaScript click first, straight through CDP when the button has a CSS selector
                 logger.info("Attempting to click via JavaScript")
-                self.driver.execute_script("arguments[0].click();", login_button)
-            except Exception as e:
+                if not (login_selector and self._cdp_click(login_selector)):
+                    self.driver.execute_script(SCROLL_AND_CLICK_JS, login_button)
+            except CLICK_FALLBACK_EXCEPTIONS as e:
                 logger.warning(f"JavaScript click failed: {str(e)}, trying regular click")
-                time.sleep(1)
                 try:
                     login_button.click()
-                except Exception as e:
+                except CLICK_FALLBACK_EXCEPTIONS as e:
                     logger.warning(f"Regular click failed: {str(e)}, trying action chains")
                     # If regular click fails, try action chains
-                    from selenium.webdriver.common.action_chains import ActionChains
                     actions = ActionChains(self.driver)
                     actions.move_to_element(login_button).click().perform()
 
-            # Check for and handle security modal if it appears
-            logger.info("Checking for security modal")
-            try:
-                modal = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div[role='dialog']"))
-                )
+            # Wait for whichever comes first: the security modal or the dashboard. The click navigates to
+            # another origin, so this has to be a WebDriver wait rather than an in-page script
+            logger.info("Waiting for security modal or dashboard")
+            found = self._wait_for_any_locator([ENTENDIDO_BUTTON, DASHBOARD], 20)
+            if found == -1:
+                raise TimeoutException("Neither the security modal nor the dashboard appeared")
+            
+            if found == 0:
                 logger.info("Security modal detected")
                 
-                # Find and click the "Entendido" button with wait
-                logger.info("Waiting for 'Entendido' button")
-                entendido_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.ID, "entendido"))
-                )
-                logger.info("Clicking 'Entendido' button")
-                self.driver.execute_script("arguments[0].click();", entendido_button)
-                time.sleep(1)  # Wait for modal to close
-            except TimeoutException:
-                logger.info("No security modal detected")
-                pass
+                # The race has already seen the "Entendido" button, so look it up without waiting
+                entendido_buttons = self.driver.find_elements(*ENTENDIDO_BUTTON)
+                if entendido_buttons:
+                    logger.info("Clicking 'Entendido' button")
+                    if not self._cdp_click(ENTENDIDO_BUTTON[1]):
+                        self.driver.execute_script("arguments[0].click();", entendido_buttons[0])
+                    # Wait for modal to close
+                    fast_wait(self.driver, 5).until(
+                        EC.invisibility_of_element(entendido_buttons[0])
+                    )
+                else:
+                    logger.warning("'Entendido' button not found in security modal")
 
-            # Wait for dashboard to load by checking for welcome message
-            logger.info("Waiting for dashboard to load")
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "c-data-amount"))
-            )
+                # Wait for dashboard to load by checking for welcome message
+                logger.info("Waiting for dashboard to load")
+                WebDriverWait(self.driver, 20).until(EC.presence_of_element_located(DASHBOARD))
+            else:
+                logger.info("No security modal detected")
 
             logger.info("Login successful")
+            self._save_session()
             return True
 
         except TimeoutException:
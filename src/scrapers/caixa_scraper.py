@@ -5,10 +5,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import csv
+import itertools
 import logging
 import os
 from typing import Optional, List, Dict, Any
-import time
 import json
 import websocket
 import requests
@@ -18,6 +19,14 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 import traceback
 
+try:
+    # orjson parses CDP frames and encodes outgoing commands considerably faster; stdlib json is the fallback.
+    # orjson encodes to UTF-8 bytes, which websocket-client sends as a text frame as-is
+    from orjson import loads as json_loads, dumps as json_dumps
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
 # Load environment variables
 load_dotenv()
 
@@ -29,7 +38,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Resource types the scraper never reads, failed in its tab to speed up page loads
+BLOCKED_RESOURCE_TYPES = ("Image", "Font", "Media")
+
+# Fetch interception patterns: blocked resources pause before they are sent, no other request
+# reaches the WebSocket. Transactions are read from the page, so no response body is captured
+FETCH_PATTERNS = [
+    {"urlPattern": "*", "resourceType": resource_type, "requestStage": "Request"}
+    for resource_type in BLOCKED_RESOURCE_TYPES
+]
+
+# Locators for the login and navigation flow, built once per process
+USERNAME_INPUT = (By.ID, "lineaabierta-login")
+LOGIN_SUBMIT = (By.CSS_SELECTOR, "#lolopo-template > div:nth-of-type(2) > div:nth-of-type(6) > form > div:nth-of-type(3) > input")
+OUTER_IFRAME = (By.XPATH, "(//iframe)[3]")  # iframe index 2 -> third iframe
+FIRST_IFRAME = (By.XPATH, "(//iframe)[1]")  # iframe index 0 inside parent
+CUENTAS_Y_TARJETAS = (By.CSS_SELECTOR, "#pestanya0 > a > span")
+NAVBAR_IFRAME = (By.CSS_SELECTOR, "iframe[name='Navbar'], iframe#Navbar")
+MIS_FINANZAS = (By.XPATH, "//*[@id='pestanya1']//span[text()='Mis Finanzas']")
+COS_IFRAME = (By.CSS_SELECTOR, "iframe[name='Cos'], iframe[title='Cuerpo']")
+INFERIOR_IFRAME = (By.CSS_SELECTOR, "iframe[name='Inferior'], iframe#Inferior, iframe[title='Inferior']")
+ULTIMOS_MOVIMIENTOS = (By.CSS_SELECTOR, "#ACTIVIDAD_titulo a[class='general_dashboard__grid__item__link general_dashboard__grid__item__handle']")
+PERIOD_FILTER = (By.XPATH, "//div[contains(@class,'filter_title_label') and contains(.,'Período')]/following-sibling::div[contains(@class,'filter_title_data_big')]")
+SEIS_MESES = (By.ID, "filtro_periodo_3")
+FILTRAR_BUTTON = (By.ID, "filtro_enlaceAceptar")
+PAGINATION = (By.ID, "paginacionAcumulativa01")
+VER_MAS_BUTTON = (By.CSS_SELECTOR, "#paginacionAcumulativa01 .c-pagination__custom__pageListCumulative__inner__link")
+TRANSACTION_ROWS = (By.CSS_SELECTOR, "#divListaMovimientos tr")  # every row, read or unread (noLeido)
+TRANSACTION_LIST = (By.ID, "divListaMovimientos")
+
+@dataclass(slots=True)
 class Transaction:
     date: datetime
     description: str
@@ -40,7 +78,7 @@ class Transaction:
     more_info: str = ""
     account: str = "Unknown"  # Added account field for CaixaBank's multiple account structure
 
-@dataclass
+@dataclass(slots=True)
 class AccountBalance:
     account_number: str
     account_type: str
@@ -56,12 +94,14 @@ class CaixaScraper:
         self.password = str(os.getenv("CAIXA_PASSWORD"))
         self.ver_mas_pages = int(os.getenv("CAIXA_VER_MAS_PAGES", "2"))
         self.driver = None
+        self.wait = None
         self.debugger_address = debugger_address
         self.ws = None
         self.ws_thread = None
         self.ws_ready = Event()
         self.network_enabled = False
-        self.captured_responses = {}
+        # Commands sent after Fetch.enable get their own ids
+        self._next_message_id = itertools.count(1000)
         
         # Store extracted transactions
         self.transactions: List[Transaction] = []
@@ -87,6 +127,9 @@ class CaixaScraper:
             self.debugger_address = self.driver.capabilities['ms:edgeOptions']['debuggerAddress']
             logger.info(f"Started new Edge instance with debugger address: {self.debugger_address}")
 
+        # Shared wait for the login and navigation steps, built once per driver
+        self.wait = WebDriverWait(self.driver, 20)
+
         # Create a new tab and switch to it
         logger.info("Creating new tab")
         self.driver.switch_to.new_window('tab')
@@ -101,37 +144,39 @@ class CaixaScraper:
 
     def _on_ws_message(self, ws, message):
         try:
-            msg = json.loads(message)
+            # Drop frames that are neither command replies nor paused requests before parsing them
+            if '"id":' not in message and "Fetch.requestPaused" not in message:
+                return
+            
+            msg = json_loads(message)
             if msg.get("id") == 1 and "result" in msg:
                 self.network_enabled = True
                 self.ws_ready.set()
                 logger.info("WebSocket network monitoring ready")
                 return
 
-            if msg.get("method") == "Network.responseReceived":
+            # FETCH_PATTERNS only pauses blocked resource types at the Request stage
+            if msg.get("method") == "Fetch.requestPaused":
                 request_id = msg["params"]["requestId"]
-                url = msg["params"]["response"]["url"]
-                # TODO: Identify the correct URL for transactions and capture it
-                if "my-finances" in url: # This is a placeholder
-                    logger.info(f"Capturing response for URL: {url}")
-                    self.captured_responses[request_id] = None # Placeholder for now
-
-            if msg.get("id") in self.captured_responses and "result" in msg:
-                request_id = msg["id"]
-                self.captured_responses[request_id] = msg["result"]["body"]
-                logger.info(f"Got response body for request {request_id}")
+                self._send_command(ws, "Fetch.failRequest", {"requestId": request_id, "errorReason": "BlockedByClient"})
 
         except Exception as e:
             logger.error(f"Error in WebSocket message handler: {e}")
 
     def _on_ws_open(self, ws):
         logger.info("WebSocket connected, enabling network monitoring...")
-        ws.send(json.dumps({"id": 1, "method": "Network.enable"}))
+        ws.send(json_dumps({"id": 1, "method": "Fetch.enable", "params": {"patterns": FETCH_PATTERNS}}))
+
+    def _send_command(self, ws, method: str, params: Dict[str, Any]) -> int:
+        """Send a CDP command with a fresh id and return the id"""
+        rid = next(self._next_message_id)
+        ws.send(json_dumps({"id": rid, "method": method, "params": params}))
+        return rid
 
     def _start_ws_listener(self):
         # Find the correct target page
         res = requests.get(f"http://{self.debugger_address}/json/list")
-        targets = res.json()
+        targets = json_loads(res.content)
         target = next((t for t in targets if t.get('url') and 'caixabank' in t.get('url')), None)
 
         if not target:
@@ -148,19 +193,19 @@ class CaixaScraper:
     def login(self):
         logger.info("Starting login process")
         try:
-            wait = WebDriverWait(self.driver, 20)
+            wait = self.wait
             try:
                 # Find username field
-                user_field = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="lineaabierta-login"]')))
+                user_field = wait.until(EC.element_to_be_clickable(USERNAME_INPUT))
                 user_field.send_keys(self.username)
                 # Find password field
                 # The recorded flow uses Tab, let's simulate that
                 user_field.send_keys(webdriver.common.keys.Keys.TAB)
-                time.sleep(0.5) # small delay
-                pass_field = self.driver.switch_to.active_element
+                # Wait until focus has actually left the username field
+                pass_field = wait.until(lambda d: d.switch_to.active_element != user_field and d.switch_to.active_element)
                 pass_field.send_keys(self.password)
                 # Find and click login button
-                login_button = wait.until(EC.element_to_be_clickable((By.XPATH, '//*[@id="lolopo-template"]/div[2]/div[6]/form/div[3]/input')))
+                login_button = wait.until(EC.element_to_be_clickable(LOGIN_SUBMIT))
                 login_button.click()
                 logger.info("Login submitted")
                 logger.info("Login successful")
@@ -176,27 +221,21 @@ class CaixaScraper:
     def navigate_to_finances(self):
         logger.info("Navigating to finances section")
         try:
-            wait = WebDriverWait(self.driver, 20)
+            wait = self.wait
 
             # Step 1: Navigate to the outer iframe (third iframe on page)
             logger.info("Waiting for outer iframe...")
-            outer_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "(//iframe)[3]"))  # iframe index 2 -> third iframe
-            )
+            outer_iframe = wait.until(EC.presence_of_element_located(OUTER_IFRAME))
             self.driver.switch_to.frame(outer_iframe)
 
             # Step 2: Navigate to the inner iframe (first iframe inside the outer)
             logger.info("Waiting for inner iframe...")
-            inner_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "(//iframe)[1]"))  # iframe index 0 inside parent
-            )
+            inner_iframe = wait.until(EC.presence_of_element_located(FIRST_IFRAME))
             self.driver.switch_to.frame(inner_iframe)
 
             # Step 3: Click on "Cuentas y Tarjetas" first to navigate to the accounts section
             logger.info("Waiting for 'Cuentas y Tarjetas' link...")
-            cuentas_y_tarjetas = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//*[@id='pestanya0']/a/span"))
-            )
+            cuentas_y_tarjetas = wait.until(EC.element_to_be_clickable(CUENTAS_Y_TARJETAS))
             logger.info("Clicking on 'Cuentas y Tarjetas'...")
             cuentas_y_tarjetas.click()
             
@@ -206,23 +245,17 @@ class CaixaScraper:
             
             # Navigate to the outer iframe again (third iframe)
             logger.info("Re-navigating to outer iframe...")
-            outer_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "(//iframe)[3]"))
-            )
+            outer_iframe = wait.until(EC.presence_of_element_located(OUTER_IFRAME))
             self.driver.switch_to.frame(outer_iframe)
             
             # Now look for the Navbar iframe (it should be visible after clicking Cuentas y Tarjetas)
             logger.info("Looking for Navbar iframe...")
-            navbar_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "//iframe[@name='Navbar' or @id='Navbar']"))
-            )
+            navbar_iframe = wait.until(EC.presence_of_element_located(NAVBAR_IFRAME))
             self.driver.switch_to.frame(navbar_iframe)
             
             # Step 5: Click on "Mis finanzas"
             logger.info("Waiting for 'Mis finanzas' link...")
-            mis_finanzas = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//*[@id='pestanya1']//span[text()='Mis Finanzas']"))
-            )
+            mis_finanzas = wait.until(EC.element_to_be_clickable(MIS_FINANZAS))
             logger.info("Clicking on 'Mis finanzas'...")
             mis_finanzas.click()
             
@@ -232,52 +265,35 @@ class CaixaScraper:
             
             # Navigate to the outer iframe again (third iframe)
             logger.info("Re-navigating to outer iframe for Cos...")
-            outer_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "(//iframe)[3]"))
-            )
+            outer_iframe = wait.until(EC.presence_of_element_located(OUTER_IFRAME))
             self.driver.switch_to.frame(outer_iframe)
-            time.sleep(1)  # Give the page time to load
             # Now look for the Cos iframe
             logger.info("Looking for Cos iframe...")
-            cos_iframe = wait.until(
-                EC.presence_of_element_located((By.XPATH, "//iframe[@name='Cos' or @title='Cuerpo']"))
-            )
+            cos_iframe = wait.until(EC.presence_of_element_located(COS_IFRAME))
             self.driver.switch_to.frame(cos_iframe)
             
             # Step 7: Click on "Últimos movimientos"
             logger.info("Waiting for 'Últimos movimientos' section...")
-            ultimos_movimientos = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//div[@id='ACTIVIDAD_titulo']//a[@class='general_dashboard__grid__item__link general_dashboard__grid__item__handle']"))
-            )
-            time.sleep(1)
+            ultimos_movimientos = wait.until(EC.element_to_be_clickable(ULTIMOS_MOVIMIENTOS))
             logger.info("Clicking on 'Últimos movimientos'...")
             ultimos_movimientos.click()
             
             logger.info("Successfully navigated to transactions page")
-            time.sleep(1)
 
             # Step 8: Cambiar filtro Período de "Febrero" (mes actual) a "6 meses" para cargar más movimientos
             try:
                 logger.info("Opening period filter (Período)...")
-                period_filter_label = wait.until(
-                    EC.presence_of_element_located((By.XPATH, "//div[contains(@class,'filter_title_label') and contains(.,'Período')]"))
-                )
-                period_data_big = period_filter_label.find_element(By.XPATH, "./following-sibling::div[contains(@class,'filter_title_data_big')]")
+                period_data_big = wait.until(EC.presence_of_element_located(PERIOD_FILTER))
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", period_data_big)
-                time.sleep(0.3)
-                period_data_big.click()
+                wait.until(EC.element_to_be_clickable(period_data_big)).click()
                 logger.info("Period filter opened, selecting '6 meses'...")
-                seis_meses = wait.until(
-                    EC.element_to_be_clickable((By.ID, "filtro_periodo_3"))
-                )
+                seis_meses = wait.until(EC.element_to_be_clickable(SEIS_MESES))
                 seis_meses.click()
-                time.sleep(0.5)
                 logger.info("Clicking 'Filtrar' to apply period filter...")
-                filtrar_btn = wait.until(
-                    EC.element_to_be_clickable((By.ID, "filtro_enlaceAceptar"))
-                )
+                filtrar_btn = wait.until(EC.element_to_be_clickable(FILTRAR_BUTTON))
                 filtrar_btn.click()
-                time.sleep(2)  # Esperar a que la página recargue los movimientos con el nuevo período
+                # Esperar a que se cierre el filtro; la paginación se espera más abajo
+                wait.until(EC.invisibility_of_element(filtrar_btn))
                 logger.info("Period set to 6 months and filter applied")
             except (TimeoutException, NoSuchElementException) as e:
                 logger.warning(f"Could not set period filter to 6 months: {e}. Continuing with default period.")
@@ -289,41 +305,43 @@ class CaixaScraper:
             
             # Scroll down to ensure the button is visible
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
             
             try:
-                pagination_container = wait.until(
-                    EC.presence_of_element_located((By.ID, "paginacionAcumulativa01"))
-                )
+                pagination_container = wait.until(EC.presence_of_element_located(PAGINATION))
                 logger.info(f"Found pagination_container {pagination_container.text}")
                 
                 self.driver.switch_to.default_content()
                 
                 logger.info("Looking for Inferior iframe...")
-                inferior_iframe = wait.until(
-                    EC.presence_of_element_located((By.XPATH, "//iframe[@name='Inferior' or @id='Inferior' or @title='Inferior']"))
-                )
+                inferior_iframe = wait.until(EC.presence_of_element_located(INFERIOR_IFRAME))
                 self.driver.switch_to.frame(inferior_iframe)
                 logger.info("Switched to Inferior iframe")
                 
                 logger.info("Looking for Cos iframe inside Inferior...")
-                cos_iframe = wait.until(
-                    EC.presence_of_element_located((By.XPATH, "//iframe[@name='Cos' or @title='Cuerpo']"))
-                )
+                cos_iframe = wait.until(EC.presence_of_element_located(COS_IFRAME))
                 self.driver.switch_to.frame(cos_iframe)
                 logger.info("Switched to Cos iframe")
                 
                 for page_num in range(self.ver_mas_pages):
                     try:
-                        pagination_container = self.driver.find_element(By.ID, "paginacionAcumulativa01")
-                        ver_mas_button = pagination_container.find_element(By.CLASS_NAME, "c-pagination__custom__pageListCumulative__inner__link")
+                        rows_before = len(self.driver.find_elements(*TRANSACTION_ROWS))
+                        ver_mas_button = self.driver.find_element(*VER_MAS_BUTTON)
                         logger.info(f"Clicking 'Ver más movimientos' ({page_num + 1}/{self.ver_mas_pages})...")
                         self.driver.execute_script("arguments[0].scrollIntoView(true);", ver_mas_button)
                         ver_mas_button.click()
-                        time.sleep(1)
+                        # Each click appends a page of rows and may re-render the button; wait for either instead of a fixed delay
+                        wait.until(EC.any_of(
+                            lambda d: len(d.find_elements(*TRANSACTION_ROWS)) > rows_before,
+                            EC.staleness_of(ver_mas_button)
+                        ))
                     except NoSuchElementException:
                         logger.warning("'Ver más movimientos' button not found - no more pages or structure changed")
                         break
+                    except TimeoutException:
+                        logger.warning(f"No new transactions loaded after 'Ver más movimientos' (page {page_num + 1})")
+                        # Keep paginating while the button is still there; the next click may load the page
+                        if not self.driver.find_elements(*VER_MAS_BUTTON):
+                            break
                     except Exception as e:
                         logger.warning(f"Error clicking 'Ver más movimientos' (page {page_num + 1}): {e}")
                         break
@@ -571,7 +589,7 @@ class CaixaScraper:
         
         try:
             # Wait for the page to load
-            wait = WebDriverWait(self.driver, 20)
+            wait = self.wait
             
             # Look for the transaction container (same approach as dev runner)
             logger.info("Looking for transaction container...")
@@ -579,9 +597,7 @@ class CaixaScraper:
             # Wait for the container to be present
             table_container = None
             try:
-                table_container = wait.until(
-                    EC.presence_of_element_located((By.ID, "divListaMovimientos"))
-                )
+                table_container = wait.until(EC.presence_of_element_located(TRANSACTION_LIST))
                 logger.info("Found transaction container divListaMovimientos")
             except TimeoutException:
                 logger.warning("Transaction container not found, trying alternative selectors...")
@@ -615,7 +631,7 @@ class CaixaScraper:
             # Process each transaction element
             for i, elem in enumerate(transaction_elements, start=1):
                 try:
-                    logger.info(f"Processing transaction {i}")
+                    logger.debug("Processing transaction %d", i)
                     
                     # Extract date from fecha-cell
                     try:
@@ -630,7 +646,7 @@ class CaixaScraper:
                         continue
                     
                     formatted_date = self.parse_date(date_text)
-                    logger.info(f"Date: {date_text} -> {formatted_date}")
+                    logger.debug("Date: %s -> %s", date_text, formatted_date)
                     
                     # Extract merchant name from categoria-cell
                     try:
@@ -664,7 +680,7 @@ class CaixaScraper:
                         logger.warning(f"Error extracting merchant name for transaction {i}: {e}")
                         merchant_name = "Unknown"
                     
-                    logger.info(f"Merchant: {merchant_name}")
+                    logger.debug("Merchant: %s", merchant_name)
                     
                     # Extract account information from activities__cell_service
                     try:
@@ -673,7 +689,7 @@ class CaixaScraper:
                     except:
                         account_info = "Unknown"
                     
-                    logger.info(f"Account: {account_info}")
+                    logger.debug("Account: %s", account_info)
                     
                     # Extract amount from precio-cell
                     try:
@@ -684,11 +700,11 @@ class CaixaScraper:
                         logger.warning(f"No amount found for transaction {i}")
                         amount = 0.0
                     
-                    logger.info(f"Amount: {amount}")
+                    logger.debug("Amount: %s", amount)
                     
                     # Categorize the transaction
                     concepto = self.categorize_transaction(merchant_name, amount)
-                    logger.info(f"Category: {concepto}")
+                    logger.debug("Category: %s", concepto)
                     
                     # Create Transaction object
                     from datetime import datetime
@@ -709,7 +725,7 @@ class CaixaScraper:
                     
                     transactions.append(transaction)
                     
-                    logger.info(f"Successfully processed transaction {i}")
+                    logger.debug("Successfully processed transaction %d", i)
                     
                 except Exception as e:
                     logger.error(f"Error processing transaction {i}: {e}")
@@ -742,19 +758,15 @@ class CaixaScraper:
             filepath = os.path.join("data/exports", filename)
             
             # Create CSV with format: date,description,category,amount,account
-            import csv
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            # 64 KiB buffer: a typical export is written with a handful of syscalls
+            with open(filepath, 'w', newline='', encoding='utf-8', buffering=1 << 16) as f:
                 writer = csv.writer(f, delimiter=',')
                 writer.writerow(['date', 'description', 'category', 'amount', 'account'])
-                
-                for tx in self.transactions:
-                    writer.writerow([
-                        tx.date.strftime("%Y-%m-%d %H:%M:%S"),
-                        tx.description,
-                        tx.category,
-                        tx.amount,
-                        tx.account
-                    ])
+                # Batch-write the rows; isoformat gives the same "%Y-%m-%d %H:%M:%S" text as strftime, faster
+                writer.writerows(
+                    (tx.date.isoformat(sep=" ", timespec="seconds"), tx.description, tx.category, tx.amount, tx.account)
+                    for tx in self.transactions
+                )
             
             logger.info(f"Successfully saved {len(self.transactions)} transactions to {filepath}")
             return True
@@ -203,6 +203,11 @@ class RuralviaScraper:
             logger.error(f"Failed to fetch accounts: {str(e)}")
             logger.exception("Detailed error:")
 
+        # Normalize name and number once so every export uses the same file naming
+        for account in accounts:
+            account["_slug"] = account["name"].replace(" ", "_").lower()
+            account["_short_num"] = account["account_number"].replace(" ", "")[-10:]
+
         return accounts
 
     def _get_bank_account_transactions(self) -> List[Dict]: